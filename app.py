@@ -2,117 +2,2031 @@
 Flask Web Application for Brasileirão Players Search
 Mobile-first responsive design with Bootstrap
 """
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g
+from flask import before_render_template, template_rendered
+from markupsafe import Markup
 import requests
-from datetime import datetime
-from typing import Optional, List, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, date
+from typing import Optional, List, Dict, Iterable, Tuple, Sequence, Callable, Union
+from urllib.parse import urlencode
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+import asyncio
+import base64
+import calendar
+import csv
+import functools
+import hashlib
+import heapq
+import inspect
+import io
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import random
 import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, cada worker atualiza sozinho
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # Sem NumPy as faixas sem índice (nascimento, valor de mercado) varrem a coluna
+    np = None
 
 app = Flask(__name__)
 
+# Logging: DEBUG mostra cada busca, INFO as cargas do elenco, WARNING só problemas; OFF desliga
+LOG_LEVEL = (os.environ.get("LOG_LEVEL") or "INFO").upper()
+logger = logging.getLogger("players")
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+if LOG_LEVEL != "OFF" and not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    logger.setLevel(logging.INFO)
+    logger.warning("⚠️ LOG_LEVEL=%s desconhecido, usando INFO (DEBUG, INFO, WARNING, ERROR, CRITICAL ou OFF)",
+                   LOG_LEVEL)
+    LOG_LEVEL = "INFO"
+logger.setLevel(logging.CRITICAL + 1 if LOG_LEVEL == "OFF" else LOG_LEVEL)
+
 # Configuração de sessão
 app.secret_key = 'sua_chave_secreta_aqui_mude_em_producao'  # MUDE EM PRODUÇÃO!
 
 # API base URL - pode ser ajustado para produção
 API_BASE_URL = "http://localhost:8000"
 
+# Cache de jogadores: TTL em segundos, jitter relativo e espera após falha
+PLAYERS_CACHE_TTL = float(os.environ.get("PLAYERS_CACHE_TTL", 300))
+PLAYERS_CACHE_TTL_JITTER = float(os.environ.get("PLAYERS_CACHE_TTL_JITTER", 0.1))
+PLAYERS_CACHE_RETRY_DELAY = 30
+
+# Carga paginada de /players: tamanho da página, páginas simultâneas e header com o total
+PLAYERS_PAGE_SIZE = 1000
+PLAYERS_FETCH_CONCURRENCY = int(os.environ.get("PLAYERS_FETCH_CONCURRENCY", 4))
+PLAYERS_TOTAL_COUNT_HEADER = "X-Total-Count"
+# Sincronização incremental: acima desta fração de jogadores alterados, reconstrói tudo
+PLAYERS_DELTA_MAX_FRACTION = 0.25
+
+# Snapshot binário compartilhado entre workers e persistido entre reinícios (vazio desativa)
+PLAYERS_SNAPSHOT_DIR = os.environ.get("PLAYERS_SNAPSHOT_DIR", os.path.join(app.instance_path, "players_cache"))
+PLAYERS_SNAPSHOT_POLL_INTERVAL = 1.0  # Segundos entre verificações de nova geração
+
+# Tempo que navegador e proxy podem reaproveitar as listas de clubes sem revalidar (segundos)
+PLAYERS_AGGREGATES_MAX_AGE = 60
+
+# Cache de perfil/estatísticas por jogador: entradas (LRU), TTL e TTL dos 404 (cache negativo)
+PLAYER_DETAILS_CACHE_SIZE = int(os.environ.get("PLAYER_DETAILS_CACHE_SIZE", 1024))
+PLAYER_DETAILS_CACHE_TTL = float(os.environ.get("PLAYER_DETAILS_CACHE_TTL", 600))
+PLAYER_DETAILS_NEGATIVE_TTL = 60.0
+# Chamadas simultâneas de perfil/estatísticas por processo (um lote de comparação inteiro cabe de uma vez)
+PLAYER_DETAILS_CONCURRENCY = int(os.environ.get("PLAYER_DETAILS_CONCURRENCY", 40))
+
+# Jogadores por comparação (/compare e /api/players/compare)
+PLAYERS_COMPARE_MAX = 20
+
+# Fragmentos renderizados da página principal mantidos em memória (LRU)
+INDEX_FRAGMENT_CACHE_SIZE = int(os.environ.get("INDEX_FRAGMENT_CACHE_SIZE", 128))
+
+# Valores formatados pelos filtros de template fora do elenco (perfil, valores avulsos) lembrados (LRU)
+DISPLAY_FORMAT_MEMO_SIZE = int(os.environ.get("DISPLAY_FORMAT_MEMO_SIZE", 4096))
+
+# Jogadores por página de /api/players/search (padrão e máximo; o stream NDJSON não tem limite)
+PLAYERS_SEARCH_PAGE_SIZE = 100
+PLAYERS_SEARCH_MAX_PAGE_SIZE = 1000
+
+# Jogadores devolvidos por /api/players/<id>/similar (padrão e máximo)
+PLAYERS_SIMILAR_LIMIT = 10
+PLAYERS_SIMILAR_MAX_LIMIT = 100
+
+# Exportação em CSV: colunas padrão e jogadores por bloco escrito (e comprimido) no stream
+PLAYERS_EXPORT_FIELDS = ("id", "name", "position", "serie_label", "club_name", "calculated_age",
+                         "market_value", "contract_end")
+PLAYERS_EXPORT_CHUNK_SIZE = 500
+# Primeiros caracteres que fazem planilhas interpretarem a célula como fórmula (protegidos com ')
+PLAYERS_EXPORT_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Limites (segundos) dos histogramas de duração das etapas e requisições
+METRICS_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Metric:
+    """Métrica do processo com rótulos, exposta em /metrics no formato de texto do Prometheus"""
+
+    kind = "untyped"
+    registry = []  # Todas as métricas criadas, na ordem de exposição
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}  # tupla de rótulos -> valor (ou estado do histograma)
+        self._lock = threading.Lock()
+        _Metric.registry.append(self)
+
+    def _labels(self, key: Tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterable[str]:
+        """Linhas de amostra da métrica (sem HELP/TYPE)"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._labels(key)} {_format_metric_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class _Counter(_Metric):
+    """Contador monotônico"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class _Histogram(_Metric):
+    """Histograma de durações (contagem por faixa, soma e total)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = METRICS_DURATION_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            accumulated = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                accumulated += count
+                le = "+Inf" if bound == float("inf") else _format_metric_value(bound)
+                bucket_labels = self._labels(key, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket_labels} {accumulated}"
+            yield f"{self.name}_sum{self._labels(key)} {_format_metric_value(total)}"
+            yield f"{self.name}_count{self._labels(key)} {accumulated}"
+
+class _Collected(_Metric):
+    """Métrica lida no momento da coleta (contadores de caches, tamanho do elenco)"""
+
+    def __init__(self, name: str, description: str, kind: str, label_names: Sequence[str], collect):
+        super().__init__(name, description, label_names)
+        self.kind = kind
+        self.collect = collect  # () -> iterável de (tupla de rótulos, valor)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.collect():
+            yield f"{self.name}{self._labels(tuple(str(part) for part in key))} {_format_metric_value(value)}"
+
+class _Timer:
+    """Mede a duração de um bloco em um histograma"""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: _Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_metric_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def render_metrics() -> str:
+    """Todas as métricas do processo no formato de texto do Prometheus"""
+    return "\n".join(metric.render() for metric in _Metric.registry) + "\n"
+
+# Etapas instrumentadas (carga do elenco, busca, ordenação, renderização, chamadas à API)
+SPAN_SECONDS = _Histogram("players_span_seconds", "Duração das etapas instrumentadas", ("span",))
+REQUEST_SECONDS = _Histogram("players_http_request_duration_seconds", "Duração das requisições por endpoint",
+                             ("endpoint", "method", "status"))
+UPSTREAM_REQUESTS = _Counter("players_upstream_requests_total",
+                             "Chamadas à API de jogadores por recurso e resultado", ("resource", "outcome"))
+ROSTER_REFRESHES = _Counter("players_roster_refreshes_total",
+                            "Revalidações do elenco por resultado", ("result",))
+
+def span(name: str) -> _Timer:
+    """Mede o bloco como a etapa informada (histograma players_span_seconds)"""
+    return SPAN_SECONDS.time(span=name)
+
+def timed(name: str):
+    """Decorator que mede cada chamada da função como uma etapa"""
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorator
+
+# Tabela de bits ligados para cada valor de byte (usada para converter bitmaps em linhas)
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+def _rows_to_bitmap(rows: Iterable[int], size: int) -> int:
+    """Converte uma sequência de linhas em um bitmap (int)"""
+    buffer = bytearray((size + 7) >> 3)
+    for row in rows:
+        buffer[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buffer, 'little')
+
+def _bitmap_to_rows(bitmap: int, size: int) -> List[int]:
+    """Converte um bitmap em lista ordenada de linhas"""
+    rows = []
+    for offset, byte in enumerate(bitmap.to_bytes((size + 7) >> 3, 'little')):
+        if byte:
+            base = offset << 3
+            rows.extend([base + bit for bit in _BYTE_BITS[byte]])
+    return rows
+
+def _popcount(bitmap: int) -> int:
+    """Quantidade de linhas presentes no bitmap"""
+    return bin(bitmap).count("1")
+
+if hasattr(int, "bit_count"):  # Python 3.10+: contagem nativa, sem montar a string binária
+    _popcount = int.bit_count
+
+class _CategoricalColumn:
+    """Coluna categórica codificada em inteiros com índice invertido (bitmap por valor)"""
+
+    def __init__(self, values: Iterable, size: int):
+        self.values = []  # código -> valor
+        self._codes = {}  # valor -> código
+        self.codes = array('I')
+        rows_by_code = []
+        for row, value in enumerate(values):
+            code = self._codes.get(value)
+            if code is None:
+                code = len(self.values)
+                self._codes[value] = code
+                self.values.append(sys.intern(value) if isinstance(value, str) else value)
+                rows_by_code.append([])
+            self.codes.append(code)
+            rows_by_code[code].append(row)
+        self.bitmaps = [_rows_to_bitmap(rows, size) for rows in rows_by_code]
+
+    def match(self, value) -> int:
+        """Bitmap das linhas com o valor informado (0 se inexistente)"""
+        code = self._codes.get(value)
+        return self.bitmaps[code] if code is not None else 0
+
+    def set(self, row: int, value):
+        """Atualiza o valor de uma linha (códigos e bitmaps)"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+            self.bitmaps.append(0)
+        old_code = self.codes[row]
+        self.codes[row] = code
+        self.bitmaps[code] |= 1 << row
+        if old_code != code:
+            self.bitmaps[old_code] &= ~(1 << row)
+
+    def append(self, value):
+        """Acrescenta uma linha nova"""
+        self.codes.append(self.codes[-1] if self.codes else 0)
+        if not self.bitmaps:
+            self.values.append(None)
+            self._codes[None] = 0
+            self.bitmaps.append(0)
+        self.set(len(self.codes) - 1, value)
+
+    def discard(self, row: int):
+        """Remove a linha do índice (o código fica como estava)"""
+        self.bitmaps[self.codes[row]] &= ~(1 << row)
+
+    def copy(self) -> '_CategoricalColumn':
+        """Cópia independente (bitmaps são int imutáveis: basta copiar as listas)"""
+        column = object.__new__(_CategoricalColumn)
+        column.values, column._codes = list(self.values), dict(self._codes)
+        column.codes, column.bitmaps = self.codes[:], list(self.bitmaps)
+        return column
+
+class _RangeColumn:
+    """Coluna numérica com valores distintos ordenados e bitmaps acumulados para faixas"""
+
+    MISSING = -1
+
+    def __init__(self, values: Iterable[Optional[int]], size: int):
+        self.values = array('i', (self.MISSING if v is None else v for v in values))
+        rows_by_value = {}
+        for row, value in enumerate(self.values):
+            if value != self.MISSING:
+                rows_by_value.setdefault(value, []).append(row)
+        self.keys = sorted(rows_by_value)
+        # prefix[i] = linhas com valor <= keys[i]
+        self.prefix = []
+        accumulated = 0
+        for key in self.keys:
+            accumulated |= _rows_to_bitmap(rows_by_value[key], size)
+            self.prefix.append(accumulated)
+
+    def between(self, low: Optional[int] = None, high: Optional[int] = None) -> int:
+        """Bitmap das linhas com low <= valor <= high (limites opcionais)"""
+        start = bisect_left(self.keys, low) if low is not None else 0
+        end = bisect_right(self.keys, high) if high is not None else len(self.keys)
+        if start >= end:
+            return 0
+        upper = self.prefix[end - 1]
+        return upper & ~self.prefix[start - 1] if start > 0 else upper
+
+    def set(self, row: int, value: Optional[int]):
+        """Atualiza o valor de uma linha nos bitmaps acumulados"""
+        bit = 1 << row
+        old = self.values[row]
+        if value is not None:
+            index = bisect_left(self.keys, value)
+            if index == len(self.keys) or self.keys[index] != value:
+                self.keys.insert(index, value)
+                self.prefix.insert(index, self.prefix[index - 1] if index else 0)
+            for i in range(index, len(self.keys)):
+                self.prefix[i] |= bit
+        self.values[row] = self.MISSING if value is None else value
+        if old != self.MISSING and (value is None or value > old):
+            # Sai das faixas que incluem o valor antigo mas não o novo
+            start = bisect_left(self.keys, old)
+            end = len(self.keys) if value is None else bisect_left(self.keys, value)
+            for i in range(start, end):
+                self.prefix[i] &= ~bit
+
+    def append(self, value: Optional[int]):
+        """Acrescenta uma linha nova"""
+        self.values.append(self.MISSING)
+        self.set(len(self.values) - 1, value)
+
+    def discard(self, row: int):
+        """Remove a linha de todas as faixas"""
+        self.set(row, None)
+
+    def copy(self) -> '_RangeColumn':
+        """Cópia independente dos valores e das faixas"""
+        column = object.__new__(_RangeColumn)
+        column.values, column.keys, column.prefix = self.values[:], list(self.keys), list(self.prefix)
+        return column
+
+def _range_bitmap(values: array, low=None, high=None) -> int:
+    """Bitmap das linhas de uma coluna sem índice com low <= valor <= high (ausentes = -1 ficam fora)
+
+    Com NumPy é uma máscara vetorizada convertida por packbits no mesmo layout dos bitmaps;
+    a coluna é copiada antes (tobytes) para não prender o buffer que os deltas redimensionam.
+    """
+    missing = _RangeColumn.MISSING
+    if np is not None:
+        column = np.frombuffer(values.tobytes(), dtype=np.dtype(values.typecode))
+        mask = column != missing
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+        return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+    return _rows_to_bitmap((row for row, value in enumerate(values)
+                            if value != missing and (low is None or value >= low)
+                            and (high is None or value <= high)), len(values))
+
+def _player_id(player: Dict) -> Optional[str]:
+    """Id do jogador como string (None se ausente)"""
+    player_id = player.get("id")
+    return None if player_id is None else str(player_id)
+
+def _as_int(value) -> Optional[int]:
+    """Converte valores numéricos da API para int (None se inválido)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value)
+
+def _fold(text: str) -> str:
+    """Normaliza texto para busca: minúsculas e sem acentos"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def _trigrams(text: str) -> set:
+    """Conjunto de trigramas de um texto"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _TrigramIndex:
+    """Índice de trigramas sobre nomes normalizados para busca parcial e aproximada"""
+
+    def __init__(self, names: Iterable[str]):
+        self.folded = [sys.intern(_fold(name)) for name in names]
+        postings = {}
+        gram_counts = array('H')
+        for row, name in enumerate(self.folded):
+            # Espaços nas bordas marcam início/fim de palavra (úteis para prefixos)
+            grams = _trigrams(f"  {name} ")
+            gram_counts.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self.gram_counts = gram_counts
+        self.postings = {gram: array('I', rows) for gram, rows in postings.items()}
+        self._shared = set()  # Trigramas cujas listas são compartilhadas com uma cópia
+
+    def copy(self) -> '_TrigramIndex':
+        """Cópia que compartilha as listas de trigramas até a primeira escrita (dos dois lados)"""
+        index = object.__new__(_TrigramIndex)
+        index.folded, index.gram_counts = list(self.folded), self.gram_counts[:]
+        index.postings = dict(self.postings)
+        self._shared = set(self.postings)
+        index._shared = set(self.postings)
+        return index
+
+    def _posting(self, gram: str) -> Optional[array]:
+        """Lista do trigrama pronta para escrita (copiada se ainda compartilhada)"""
+        posting = self.postings.get(gram)
+        if posting is not None and gram in self._shared:
+            posting = self.postings[gram] = posting[:]
+            self._shared.discard(gram)
+        return posting
+
+    def set(self, row: int, name: str):
+        """Atualiza o nome de uma linha (acrescenta a linha se for nova)"""
+        folded = sys.intern(_fold(name))
+        if row == len(self.folded):
+            self.folded.append(folded)
+            self.gram_counts.append(0)
+        elif self.folded[row] == folded:
+            return
+        else:
+            self.discard(row)
+            self.folded[row] = folded
+        grams = _trigrams(f"  {folded} ")
+        self.gram_counts[row] = min(len(grams), 0xFFFF)
+        for gram in grams:
+            posting = self._posting(gram)
+            if posting is None:
+                self.postings[gram] = array('I', [row])
+            else:
+                posting.append(row)
+
+    def discard(self, row: int):
+        """Tira a linha das listas de trigramas"""
+        for gram in _trigrams(f"  {self.folded[row]} "):
+            posting = self.postings.get(gram)
+            if posting is not None and row in posting:
+                self._posting(gram).remove(row)
+
+    def candidates(self, needle: str) -> Optional[List[int]]:
+        """Linhas cujo nome contém o texto já normalizado (None se curto demais para o índice)"""
+        grams = _trigrams(needle)
+        if not grams:
+            return None
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        if not postings[0]:
+            return []
+        rows = set(postings[0])
+        for posting in postings[1:]:
+            rows.intersection_update(posting)
+            if not rows:
+                return []
+        # Trigramas em comum não garantem a ordem: confirma a substring
+        folded = self.folded
+        return sorted(row for row in rows if needle in folded[row])
+
+    def similar(self, text: str, limit: int = 100, threshold: float = 0.3) -> List[Tuple[int, float]]:
+        """Ranking aproximado por trigramas em comum: lista de (linha, score)
+
+        Score: cobertura da consulta primeiro, coeficiente de Dice para desempate. Os trigramas
+        comuns ('  j', 'ilv') têm listas com milhares de linhas; com NumPy a contagem é um
+        bincount sobre as listas concatenadas e o score de todas as linhas acima do mínimo é
+        calculado em lote, com as melhores por argpartition; sem NumPy, Counter e só as
+        limit*4 linhas com mais trigramas em comum são pontuadas.
+        """
+        grams = _trigrams(f"  {_fold(text).strip()} ")
+        postings = [posting for posting in map(self.postings.get, grams) if posting]
+        if limit <= 0 or not postings:
+            return []
+        minimum = max(1, int(len(grams) * threshold))
+        total = len(grams)
+        if np is not None:
+            # Listas copiadas (tobytes) para não prender os buffers que os deltas alteram
+            counts = np.bincount(np.concatenate([np.frombuffer(posting.tobytes(), dtype=np.uint32)
+                                                 for posting in postings]))
+            rows = np.flatnonzero(counts >= minimum)
+            gram_counts = np.frombuffer(self.gram_counts.tobytes(), dtype=np.uint16)[rows]
+            shared = counts[rows]
+            scores = shared / total + 2 * shared / (total + gram_counts) / 10
+            if len(rows) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                rows, scores = rows[top], scores[top]
+            order = np.lexsort((rows, -scores))
+            return list(zip(rows[order].tolist(), scores[order].tolist()))
+        shared = Counter()
+        for posting in postings:
+            shared.update(posting)
+        gram_counts = self.gram_counts
+        ranked = []
+        for row, count in shared.most_common(limit * 4):
+            if count < minimum:
+                break
+            dice = 2 * count / (total + gram_counts[row])
+            ranked.append((row, count / total + dice / 10))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+# Campos normalizados de cada jogador, na ordem devolvida por _player_fields
+PLAYER_FIELDS = ("id", "name", "position", "serie", "club_name", "age", "birth", "contract_end", "market_value")
+
+# Ordenações aceitas pela página principal (apelidos -> chave canônica)
+PLAYER_SORT_KEYS = ("name", "age", "market_value", "contract_end", "position", "club_name", "serie")
+PLAYER_SORT_ALIASES = {"marketValue": "market_value", "contract": "contract_end", "club": "club_name"}
+
+# Campos aceitos na projeção de /api/players/search (registro da API + campos normalizados)
+PLAYER_API_FIELDS = ("id", "name", "position", "serie", "club_name", "age", "dateOfBirth", "marketValue",
+                     "contract", "calculated_age", "market_value", "contract_end", "serie_label")
+PLAYER_API_DEFAULT_FIELDS = ("id", "name", "position", "serie", "club_name", "age", "marketValue", "contract")
+
+# Faixas das facetas: idade (limites inclusivos) e expiração de contrato em meses (as opções do filtro)
+PLAYER_FACET_AGE_BUCKETS = ((None, 20), (21, 23), (24, 27), (28, 31), (32, None))
+PLAYER_FACET_CONTRACT_MONTHS = (3, 6, 12, 18)
+
+# Campos somados nos totais por temporada, competição e carreira das estatísticas do jogador
+PLAYER_STATS_TOTAL_FIELDS = ("appearances", "minutesPlayed", "goals", "assists", "yellowCards", "redCards")
+
+# Jogadores parecidos: peso de cada característica na distância (idade, valor, contrato e série
+# padronizados: 1 desvio-padrão de diferença soma peso²; posição diferente soma peso² também)
+PLAYER_SIMILAR_WEIGHTS = {"position": 2.0, "age": 1.0, "market_value": 1.0, "contract_months": 0.5, "serie": 0.5}
+PLAYER_SIMILAR_SERIE_RANKS = {"Série A": 0, "Série B": 1, "Série C": 2, "Série D": 3}
+
+class _SimilarityIndex:
+    """Vetores de características do elenco para busca de jogadores parecidos
+
+    Cada linha vira posição em one-hot e, padronizados (z-score, ausentes na média), idade,
+    valor de mercado (log), meses até o fim do contrato e série (A=0 ... D=3), cada bloco
+    multiplicado pelo seu peso. Com NumPy a matriz é montada com operações vetorizadas, as
+    distâncias são calculadas em lote (|x|² - 2x·v + |v|²) e os K menores saem por argpartition;
+    sem NumPy, listas e heapq.
+    """
+
+    def __init__(self, store: 'PlayerStore', today: date):
+        self.size = store.size
+        weights = PLAYER_SIMILAR_WEIGHTS
+        serie_ranks = [PLAYER_SIMILAR_SERIE_RANKS.get(normalize_serie(value)) for value in store.serie.values]
+        position_weight = weights["position"] / math.sqrt(2)  # Duas posições diferentes: peso² na distância
+        if np is not None:
+            self._build_vectorized(store, today, serie_ranks, position_weight)
+            return
+        missing = _RangeColumn.MISSING
+        today_ordinal = today.toordinal()
+        ages, calculated = store.age.values, store.calculated_ages()
+        columns = {
+            "age": [age if age not in (missing, 0) else calc if calc not in (missing, 0) else None
+                    for age, calc in zip(ages, calculated)],
+            "market_value": [math.log1p(value) if value >= 0 else None for value in store.market_value],
+            "contract_months": [max(0, ordinal - today_ordinal) / 30.44 if ordinal != missing else None
+                                for ordinal in store.contract_end],
+            "serie": [serie_ranks[code] for code in store.serie.codes],
+        }
+        numeric = [self._standardized(values, weights[name]) for name, values in columns.items()]
+        positions = len(store.position.values)
+        one_hot = [tuple(position_weight if code == index else 0.0 for index in range(positions))
+                   for code in store.position.codes]
+        self.matrix = [position + tuple(features) for position, *features in zip(one_hot, *numeric)]
+
+    @staticmethod
+    def _standardized(values: List[Optional[float]], weight: float) -> List[float]:
+        present = [value for value in values if value is not None]
+        if not present:
+            return [0.0] * len(values)
+        mean = sum(present) / len(present)
+        std = math.sqrt(sum((value - mean) ** 2 for value in present) / len(present)) or 1.0
+        return [(value - mean) / std * weight if value is not None else 0.0 for value in values]
+
+    def _build_vectorized(self, store: 'PlayerStore', today: date, serie_ranks: List[Optional[int]],
+                          position_weight: float):
+        missing = _RangeColumn.MISSING
+        column = lambda values: np.frombuffer(values.tobytes(), dtype=np.dtype(values.typecode))
+        ages, calculated = column(store.age.values), column(store.calculated_ages())
+        calculated = np.where((calculated != missing) & (calculated != 0), calculated, np.nan)
+        market_value = column(store.market_value)
+        contract_end = column(store.contract_end)
+        rank_table = np.array([np.nan if rank is None else rank for rank in serie_ranks], dtype=np.float64)
+        columns = {
+            "age": np.where((ages != missing) & (ages != 0), ages, calculated),
+            "market_value": np.where(market_value >= 0, np.log1p(np.maximum(market_value, 0)), np.nan),
+            "contract_months": np.where(contract_end != missing,
+                                        np.maximum(contract_end - today.toordinal(), 0) / 30.44, np.nan),
+            "serie": rank_table[column(store.serie.codes)] if len(rank_table) else np.full(self.size, np.nan),
+        }
+        matrix = np.zeros((self.size, len(store.position.values) + len(columns)), dtype=np.float32)
+        matrix[np.arange(self.size), column(store.position.codes)] = position_weight
+        for offset, (name, values) in enumerate(columns.items(), len(store.position.values)):
+            present = ~np.isnan(values)
+            if present.any():
+                mean, std = values[present].mean(), values[present].std() or 1.0
+                matrix[:, offset] = np.where(present, (values - mean) / std * PLAYER_SIMILAR_WEIGHTS[name], 0.0)
+        self.matrix = matrix
+        self.norms = np.einsum('ij,ij->i', matrix, matrix)
+
+    def nearest(self, row: int, bitmap: int, limit: int) -> List[Tuple[int, float]]:
+        """Até limit linhas do bitmap mais próximas da linha informada (sem ela): (linha, distância)"""
+        bitmap &= ((1 << self.size) - 1) & ~(1 << row)
+        if limit <= 0 or not bitmap:
+            return []
+        if np is None:
+            vector = self.matrix[row]
+            matrix = self.matrix
+            distances = ((sum((a - b) ** 2 for a, b in zip(matrix[other], vector)), other)
+                         for other in _bitmap_to_rows(bitmap, self.size))
+            return [(other, math.sqrt(distance)) for distance, other in heapq.nsmallest(limit, distances)]
+        mask = np.unpackbits(np.frombuffer(bitmap.to_bytes((self.size + 7) // 8, 'little'), dtype=np.uint8),
+                             count=self.size, bitorder='little')
+        candidates = np.flatnonzero(mask)
+        # Distâncias de todo o elenco em lote (produto matriz-vetor), depois só as dos candidatos
+        distances = self.norms - 2 * (self.matrix @ self.matrix[row]) + self.norms[row]
+        distances = np.maximum(distances[candidates], 0)
+        k = min(limit, len(candidates))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind='stable')]
+        return [(int(candidates[i]), math.sqrt(float(distances[i]))) for i in top]
+
+# Versões dos armazenamentos do elenco (únicas no processo, também após deltas)
+_STORE_VERSIONS = itertools.count(1)
+
+class PlayerStore:
+    """Armazenamento colunar do elenco em memória com índices por campo"""
+
+    def __init__(self, records: Sequence[Dict], columns: Dict[str, Iterable],
+                 generation: int = 0, created_at: Optional[float] = None):
+        self.size = len(records)  # Linhas físicas (inclui removidas pela sincronização incremental)
+        self.count = self.size  # Linhas vivas
+        self.records = records
+        # Ids e nomes de um snapshot continuam no mapeamento (_SnapshotStrings), sem cópia por worker
+        self.ids = columns["id"] if isinstance(columns["id"], Sequence) else list(columns["id"])
+        self._rows_by_id = None
+        self.generation = generation
+        self.version = next(_STORE_VERSIONS)  # Muda a cada alteração do conteúdo (chave de caches)
+        self.created_at = created_at if created_at is not None else time.time()
+        self.modified_at = self.created_at  # Última alteração do conteúdo (Last-Modified)
+        self.all_rows = (1 << self.size) - 1
+        # Nome original (None se ausente), para projeções
+        self.name_values = columns["name"] if isinstance(columns["name"], Sequence) else list(columns["name"])
+        names = [name or "" for name in self.name_values]
+        # Nomes normalizados (sem acento) indexados por trigramas
+        self.names = _TrigramIndex(names)
+        # Chave de ordenação por nome; sem acentos ela é igual ao nome normalizado e reaproveita a string
+        self.name_keys = [key if key != folded else folded
+                          for key, folded in zip((name.lower() for name in names), self.names.folded)]
+        self.position = _CategoricalColumn(columns["position"], self.size)
+        self.serie = _CategoricalColumn(columns["serie"], self.size)
+        self.club = _CategoricalColumn(columns["club_name"], self.size)
+        self.age = _RangeColumn(columns["age"], self.size)
+        # Campos derivados já tipados: datas como ordinal (MISSING se ausente), valor em float (-1 se ausente)
+        self.birth = array('i', (_RangeColumn.MISSING if v is None else v for v in columns["birth"]))
+        # Fim de contrato tem milhares de datas distintas: bitmaps acumulados custariam O(datas × linhas),
+        # então as faixas são uma máscara sobre a coluna (como nascimento e valor de mercado)
+        self.contract_end = array('i', (_RangeColumn.MISSING if v is None else v for v in columns["contract_end"]))
+        self.market_value = array('d', columns["market_value"])
+        self._serie_labels = []  # código da série -> rótulo normalizado
+        self._calculated_ages = array('i')
+        self._ages_as_of = None
+        self._orders = {}  # (chave, decrescente) -> (data de referência, permutação das linhas)
+        self._memo = {}  # Agregados calculados para esta versão do elenco
+        self._display = {}  # linha -> (valor de mercado, fim do contrato) formatados para exibição
+
+    @classmethod
+    def from_players(cls, players: List[Dict], generation: int = 0,
+                     created_at: Optional[float] = None) -> 'PlayerStore':
+        """Monta o armazenamento a partir da lista de jogadores da API"""
+        fields = [_player_fields(p) for p in players]
+        columns = {name: [f[i] for f in fields] for i, name in enumerate(PLAYER_FIELDS)}
+        return cls(players, columns, generation=generation, created_at=created_at)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: '_RosterSnapshot') -> 'PlayerStore':
+        """Monta o armazenamento sobre um snapshot mapeado em memória
+
+        Registros, ids, nomes e colunas numéricas são lidos do mapeamento (uma cópia por máquina).
+        Os índices continuam privados de cada worker: nomes normalizados e chaves de ordenação,
+        listas de trigramas, bitmaps e as permutações das ordenações — cerca de 28 MB por worker
+        com 100 mil jogadores (o arquivo tem 27 MB; a lista decodificada, 79 MB).
+        """
+        columns = {name: snapshot.string_column(name) for name in _RosterSnapshot.STRING_COLUMNS}
+        columns["id"], columns["name"] = snapshot.mapped_strings("id"), snapshot.mapped_strings("name")
+        for name in _RosterSnapshot.INT_COLUMNS + _RosterSnapshot.FLOAT_COLUMNS:
+            columns[name] = snapshot.column(name)
+        return cls(snapshot.records, columns, generation=snapshot.generation, created_at=snapshot.created_at)
+
+    def serie_label(self, row: int) -> str:
+        """Rótulo normalizado da série ('Série A'...'Série D' ou o valor original)"""
+        code = self.serie.codes[row]
+        labels = self._serie_labels
+        while len(labels) < len(self.serie.values):
+            labels.append(normalize_serie(self.serie.values[len(labels)]))
+        return labels[code]
+
+    def calculated_ages(self) -> array:
+        """Idade calculada pela data de nascimento (MISSING se ausente), recalculada uma vez por dia"""
+        today = date.today()
+        if self._ages_as_of != today or len(self._calculated_ages) < self.size:
+            ages = array('i')
+            month_day = (today.month, today.day)
+            cache = {}
+            for ordinal in self.birth:
+                age = cache.get(ordinal)
+                if age is None:
+                    if ordinal == _RangeColumn.MISSING:
+                        age = _RangeColumn.MISSING
+                    else:
+                        birth = date.fromordinal(ordinal)
+                        age = today.year - birth.year - (month_day < (birth.month, birth.day))
+                    cache[ordinal] = age
+                ages.append(age)
+            self._calculated_ages = ages
+            self._ages_as_of = today
+        return self._calculated_ages
+
+    def display_values(self, row: int) -> Tuple[str, str]:
+        """Valor de mercado e fim do contrato formatados (uma vez por linha e versão do elenco)"""
+        values = self._display.get(row)
+        if values is None:
+            record = self.records[row]
+            values = self._display[row] = (format_currency(record.get('marketValue')),
+                                           format_date(record.get('contract')))
+        return values
+
+    def display_record(self, row: int) -> Dict:
+        """Cópia do registro com os campos calculados usados nos templates (não altera o cache)"""
+        age = self.calculated_ages()[row]
+        market_value, contract = self.display_values(row)
+        return {**self.records[row], 'calculated_age': age if age != _RangeColumn.MISSING else None,
+                'market_value_display': market_value, 'contract_display': contract}
+
+    def sort_key(self, sort_by: str):
+        """Função de chave por linha para a ordenação informada (só lê colunas já normalizadas)"""
+        missing = _RangeColumn.MISSING
+        if sort_by == 'age':
+            ages, calculated = self.age.values, self.calculated_ages()
+            # Idade informada, senão a calculada, senão 999 (mesma regra de antes)
+            return lambda row: (ages[row] if ages[row] not in (missing, 0) else
+                                calculated[row] if calculated[row] not in (missing, 0) else 999)
+        if sort_by == 'market_value':
+            market_value = self.market_value
+            return lambda row: max(market_value[row], 0.0)
+        if sort_by == 'contract_end':
+            contract_end, last = self.contract_end, date.max.toordinal()
+            return lambda row: contract_end[row] if contract_end[row] != missing else last
+        if sort_by in ('position', 'club_name', 'serie'):
+            column = {'position': self.position, 'serie': self.serie}.get(sort_by, self.club)
+            values, codes = column.values, column.codes
+            return lambda row: (values[codes[row]] or '').lower()
+        return self.name_keys.__getitem__
+
+    def order(self, sort_by: str, reverse: bool = False) -> array:
+        """Permutação de todas as linhas na ordem pedida (calculada uma vez por versão do elenco)"""
+        # A idade calculada muda com a data: essa permutação vale só para o dia
+        as_of = date.today() if sort_by == 'age' else None
+        cached = self._orders.get((sort_by, reverse))
+        if cached is None or cached[0] != as_of:
+            order = array('I', sorted(range(self.size), key=self.sort_key(sort_by), reverse=reverse))
+            cached = self._orders[(sort_by, reverse)] = (as_of, order)
+        return cached[1]
+
+    def prepare_orders(self):
+        """Pré-calcula as permutações de todas as ordenações nos dois sentidos"""
+        for sort_by in PLAYER_SORT_KEYS:
+            for reverse in (False, True):
+                self.order(sort_by, reverse)
+
+    def top_by_serie(self, sort_by: str, reverse: bool, bitmap: int, rows: Optional[List[int]] = None,
+                     per_serie: int = 25) -> List[Tuple[Optional[str], List[int]]]:
+        """Até per_serie linhas de cada série na ordem pedida, séries na ordem da primeira aparição
+
+        Equivale a ordenar todas as linhas e cortar por série, mas com custo proporcional ao
+        resultado: percorre a permutação pré-calculada até completar as séries ou, com poucas
+        linhas (ou uma lista vinda da busca por nome), seleciona com heap limitado por série.
+        """
+        serie = self.serie
+        codes = serie.codes
+        if rows is None:
+            wanted = {}
+            for code, serie_bitmap in enumerate(serie.bitmaps):
+                count = _popcount(bitmap & serie_bitmap)
+                if count:
+                    wanted[code] = min(count, per_serie)
+            if _popcount(bitmap) * 8 >= self.size:
+                # Conjunto grande: a permutação completa as séries logo nas primeiras linhas
+                remaining = sum(wanted.values())
+                mask = bitmap.to_bytes((max(self.size, bitmap.bit_length()) + 7) // 8, 'little')
+                groups = {}
+                for row in self.order(sort_by, reverse):
+                    if remaining == 0:
+                        break
+                    if mask[row >> 3] >> (row & 7) & 1:
+                        code = codes[row]
+                        group = groups.setdefault(code, [])
+                        if len(group) < wanted.get(code, 0):
+                            group.append(row)
+                            remaining -= 1
+                return [(serie.values[code], group) for code, group in groups.items()]
+            rows = self.rows(bitmap)
+        
+        key = self.sort_key(sort_by)
+        rows_by_code = {}
+        for row in rows:
+            rows_by_code.setdefault(codes[row], []).append(row)
+        select = heapq.nlargest if reverse else heapq.nsmallest  # estáveis como sorted()[:n]
+        groups = [(code, select(per_serie, code_rows, key=key)) for code, code_rows in rows_by_code.items()]
+        # Série aparece na posição do seu primeiro jogador (empates pela ordem de entrada)
+        position = {row: i for i, row in enumerate(rows)}
+        groups.sort(key=lambda group: position[group[1][0]])
+        groups.sort(key=lambda group: key(group[1][0]), reverse=reverse)
+        return [(serie.values[code], group) for code, group in groups]
+
+    def ordered(self, sort_by: str, reverse: bool, bitmap: int, start: int = 0) -> Iterable[Tuple[int, int]]:
+        """Linhas do bitmap na ordem pedida, a partir da posição start da permutação: (posição, linha)
+
+        Gerador preguiçoso: páginas e streams leem só o trecho da permutação que consomem.
+        """
+        order = self.order(sort_by, reverse)
+        mask = bitmap.to_bytes((max(self.size, bitmap.bit_length()) + 7) // 8, 'little')
+        for position in range(start, len(order)):
+            row = order[position]
+            if mask[row >> 3] >> (row & 7) & 1:
+                yield position, row
+
+    def position_of(self, sort_by: str, reverse: bool, player_id: str) -> Optional[int]:
+        """Posição do jogador na permutação pedida (None se o id não existe mais)"""
+        rows_by_id = self.rows_by_id()
+        row = rows_by_id.get(player_id) if rows_by_id is not None else None
+        if row is None:
+            return None
+        return self.order(sort_by, reverse).index(row)
+
+    def projector(self, fields: Sequence[str]):
+        """Função linha -> dicionário só com os campos pedidos (ver PLAYER_API_FIELDS)
+
+        Campos indexados saem das colunas; só os demais decodificam o registro da linha.
+        """
+        missing = _RangeColumn.MISSING
+        records = self.records
+        columns = {'position': self.position, 'serie': self.serie, 'club_name': self.club}
+        getters = []
+        for field in fields:
+            if field == 'calculated_age':
+                ages = self.calculated_ages()
+                getter = lambda row, ages=ages: ages[row] if ages[row] != missing else None
+            elif field == 'market_value':
+                values = self.market_value
+                getter = lambda row, values=values: values[row] if values[row] >= 0 else None
+            elif field == 'contract_end':
+                values = self.contract_end
+                getter = lambda row, values=values: (date.fromordinal(values[row]).isoformat()
+                                                     if values[row] != missing else None)
+            elif field == 'serie_label':
+                getter = self.serie_label
+            elif field == 'id':
+                getter = self.ids.__getitem__
+            elif field == 'name':
+                getter = self.name_values.__getitem__
+            elif field in columns:
+                column = columns[field]
+                getter = lambda row, column=column: column.values[column.codes[row]]
+            else:
+                getter = lambda row, field=field: records[row].get(field)
+            getters.append((field, getter))
+        return lambda row: {field: getter(row) for field, getter in getters}
+
+    def filter_bitmaps(self, position: Optional[str] = None, serie: Optional[str] = None,
+                       club: Optional[str] = None, age_min: Optional[int] = None,
+                       age_max: Optional[int] = None, contract_end_max: Optional[int] = None,
+                       contract_end_min: Optional[int] = None, birth_min: Optional[int] = None,
+                       birth_max: Optional[int] = None, market_value_min: Optional[float] = None,
+                       market_value_max: Optional[float] = None) -> Dict[str, int]:
+        """Bitmap de cada filtro ativo, por dimensão (position, serie, club, age, contract_end, birth, market_value)
+
+        Idade usa os bitmaps acumulados; fim de contrato e nascimento (ordinais) e valor de
+        mercado, uma máscara sobre a coluna. Limites são inclusivos e opcionais.
+        """
+        filters = {}
+        if position and position.strip():
+            filters['position'] = self.position.match(position.strip())
+        if serie and serie.strip():
+            filters['serie'] = self.serie.match(serie.strip())
+        if club and club.strip():
+            filters['club'] = self.club.match(club.strip())
+        if age_min is not None or age_max is not None:
+            filters['age'] = self.age.between(age_min, age_max)
+        if contract_end_min is not None or contract_end_max is not None:
+            filters['contract_end'] = _range_bitmap(self.contract_end, contract_end_min, contract_end_max)
+        if birth_min is not None or birth_max is not None:
+            filters['birth'] = _range_bitmap(self.birth, birth_min, birth_max)
+        if market_value_min is not None or market_value_max is not None:
+            filters['market_value'] = _range_bitmap(self.market_value, market_value_min, market_value_max)
+        return filters
+
+    def match(self, **filters) -> int:
+        """Intersecção dos bitmaps dos filtros de igualdade e de faixa (parâmetros de filter_bitmaps)"""
+        bitmap = self.all_rows
+        for filter_bitmap in self.filter_bitmaps(**filters).values():
+            bitmap &= filter_bitmap
+        return bitmap
+
+    def facets(self, filters: Dict[str, int], rows: Union[int, Callable[[int], int]]) -> Dict:
+        """Contagens por série, clube, posição, faixa de idade e expiração de contrato em uma passada
+
+        Cada faceta conta sobre os demais filtros (sem o seu próprio), para mostrar quantos
+        jogadores cada opção traria; rows restringe tudo (ex.: linhas da busca por nome). Quando
+        a restrição depende dos filtros (ranking aproximado por nome), rows é uma função que
+        recebe o bitmap dos demais filtros e devolve o da faceta.
+        """
+        def without(dimension: str) -> int:
+            bitmap = self.all_rows if callable(rows) else rows
+            for name, filter_bitmap in filters.items():
+                if name != dimension:
+                    bitmap &= filter_bitmap
+            return rows(bitmap) if callable(rows) else bitmap
+        
+        def counts(column: '_CategoricalColumn', base: int) -> Dict[str, int]:
+            result = {}
+            for value, bitmap in zip(column.values, column.bitmaps):
+                count = _popcount(base & bitmap) if value is not None else 0
+                if count:
+                    result[value] = result.get(value, 0) + count
+            return result
+        
+        base = without('age')
+        age = [{'min': low, 'max': high, 'count': _popcount(base & self.age.between(low, high))}
+               for low, high in PLAYER_FACET_AGE_BUCKETS]
+        base = without('contract_end')
+        today = date.today()
+        contract_end = [{'months': months,
+                         'count': _popcount(base & _range_bitmap(
+                             self.contract_end, None, add_months(today, months).toordinal()))}
+                        for months in PLAYER_FACET_CONTRACT_MONTHS]
+        return {
+            'total': _popcount(without(None)),
+            'serie': counts(self.serie, without('serie')),
+            'club': counts(self.club, without('club')),
+            'position': counts(self.position, without('position')),
+            'age': age,
+            'contract_end': contract_end,
+        }
+
+    def rows(self, bitmap: int) -> List[int]:
+        """Linhas (em ordem original) presentes no bitmap"""
+        if bitmap == self.all_rows and self.count == self.size:
+            return list(range(self.size))
+        return _bitmap_to_rows(bitmap, self.size)
+
+    def similarity_index(self) -> _SimilarityIndex:
+        """Características para jogadores parecidos (uma vez por versão do elenco; meses de contrato, por dia)"""
+        today = date.today()
+        cached = self._memo.get(("similarity",))
+        if cached is None or cached[0] != today:
+            cached = self._memo[("similarity",)] = (today, _SimilarityIndex(self, today))
+        return cached[1]
+
+    def memo(self, key, compute):
+        """Valor calculado uma vez por versão do elenco (descartado quando um delta é aplicado)"""
+        memo = self._memo
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def live_records(self) -> List[Dict]:
+        """Registros de todas as linhas vivas, na ordem do armazenamento"""
+        if self.count == self.size:
+            return list(self.records)
+        records = self.records
+        return [records[row] for row in self.rows(self.all_rows)]
+
+    def rows_by_id(self) -> Optional[Dict[str, int]]:
+        """Mapa id -> linha viva (None se há ids ausentes ou repetidos)"""
+        if self._rows_by_id is None:
+            rows_by_id = {}
+            for row in self.rows(self.all_rows):
+                player_id = self.ids[row]
+                if player_id is None or player_id in rows_by_id:
+                    return None
+                rows_by_id[player_id] = row
+            self._rows_by_id = rows_by_id
+        return self._rows_by_id
+
+    def diff(self, players: List[Dict], candidates: List[Dict]) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Delta entre o armazenamento e o elenco novo: (alterados/novos, ids removidos)
+
+        Só os jogadores em `candidates` (páginas que mudaram) são comparados registro a registro.
+        Retorna None quando o delta não pode ser aplicado (ids ausentes ou repetidos).
+        """
+        rows_by_id = self.rows_by_id()
+        if rows_by_id is None:
+            return None
+        new_ids = set()
+        for player in players:
+            player_id = _player_id(player)
+            if player_id is None or player_id in new_ids:
+                return None
+            new_ids.add(player_id)
+        records = self.records
+        upserts = []
+        for player in candidates:
+            row = rows_by_id.get(_player_id(player))
+            if row is None or records[row] != player:
+                upserts.append(player)
+        removed = [player_id for player_id in rows_by_id if player_id not in new_ids]
+        return upserts, removed
+
+    def copy(self) -> 'PlayerStore':
+        """Cópia independente para receber um delta (listas de trigramas compartilhadas até a escrita)"""
+        store = object.__new__(PlayerStore)
+        store.__dict__.update(self.__dict__)
+        store.records = self.records.copy()
+        store.ids, store.name_values, store.name_keys = self.ids.copy(), self.name_values.copy(), list(self.name_keys)
+        store.names = self.names.copy()
+        store.position, store.serie, store.club = self.position.copy(), self.serie.copy(), self.club.copy()
+        store.age = self.age.copy()
+        store.birth, store.contract_end = self.birth[:], self.contract_end[:]
+        store.market_value = self.market_value[:]
+        store._rows_by_id = dict(self._rows_by_id) if self._rows_by_id is not None else None
+        store._serie_labels = list(self._serie_labels)
+        store._orders, store._memo, store._display = {}, {}, {}
+        return store
+
+    def with_delta(self, upserts: List[Dict], removed_ids: Iterable[str]) -> 'PlayerStore':
+        """Novo armazenamento com o delta aplicado; este continua intacto para quem já o lê"""
+        store = self.copy()
+        store.apply_delta(upserts, removed_ids)
+        return store
+
+    def apply_delta(self, upserts: List[Dict], removed_ids: Iterable[str]):
+        """Aplica o delta no lugar, atualizando colunas e índices
+
+        As escritas não são atômicas para leitores concorrentes (tamanho, listas de trigramas e
+        faixas mudam em passos separados): só para armazenamentos que ninguém mais lê. O
+        armazenamento publicado recebe deltas por with_delta, que troca a referência no fim.
+        """
+        rows_by_id = self.rows_by_id()
+        for player_id in removed_ids:
+            row = rows_by_id.pop(player_id, None)
+            if row is None:
+                continue
+            self.all_rows &= ~(1 << row)
+            self.count -= 1
+            self.names.discard(row)
+            for column in (self.position, self.serie, self.club, self.age):
+                column.discard(row)
+            self.contract_end[row] = _RangeColumn.MISSING
+        for player in upserts:
+            (player_id, name, position, serie, club, age,
+             birth, contract_end, market_value) = _player_fields(player)
+            row = rows_by_id.get(player_id)
+            indexed = ((self.position, position), (self.serie, serie), (self.club, club),
+                       (self.age, age))
+            if row is None:
+                row = self.size
+                self.records.append(player)
+                self.ids.append(player_id)
+                self.name_values.append(name)
+                self.names.set(row, name or "")
+                self.name_keys.append((name or "").lower())
+                self.birth.append(_RangeColumn.MISSING if birth is None else birth)
+                self.contract_end.append(_RangeColumn.MISSING if contract_end is None else contract_end)
+                self.market_value.append(market_value)
+                for column, value in indexed:
+                    column.append(value)
+                self.size += 1
+                self.count += 1
+                self.all_rows |= 1 << row
+                rows_by_id[player_id] = row
+            else:
+                self.records[row] = player
+                self.name_values[row] = name
+                self.names.set(row, name or "")
+                self.name_keys[row] = (name or "").lower()
+                self.birth[row] = _RangeColumn.MISSING if birth is None else birth
+                self.contract_end[row] = _RangeColumn.MISSING if contract_end is None else contract_end
+                self.market_value[row] = market_value
+                for column, value in indexed:
+                    column.set(row, value)
+        self._ages_as_of = None  # Idades calculadas refeitas na próxima leitura
+        self._orders = {}  # Permutações refeitas com as linhas novas
+        self._memo = {}
+        self._display = {}
+        self.modified_at = time.time()
+        self.version = next(_STORE_VERSIONS)
+
+    def search_name(self, name: str, bitmap: int) -> List[int]:
+        """Linhas do bitmap cujo nome contém o texto (sem diferenciar acentos e caixa)"""
+        needle = _fold(name)
+        candidates = self.names.candidates(needle)
+        if candidates is None:
+            # Consulta curta demais para trigramas: varre só as linhas já filtradas
+            folded = self.names.folded
+            return [row for row in self.rows(bitmap) if needle in folded[row]]
+        if bitmap == self.all_rows:
+            return candidates
+        return self.rows(bitmap & _rows_to_bitmap(candidates, self.size))
+
+    def name_matches(self, name: str) -> int:
+        """Bitmap de todas as linhas vivas cujo nome contém o texto (para combinar com vários filtros)"""
+        needle = _fold(name)
+        candidates = self.names.candidates(needle)
+        if candidates is None:
+            folded = self.names.folded
+            candidates = (row for row in self.rows(self.all_rows) if needle in folded[row])
+        return _rows_to_bitmap(candidates, self.size)
+
+    def rank_name(self, name: str, bitmap: int, limit: int = 100) -> List[int]:
+        """Linhas do bitmap ordenadas por similaridade aproximada com o nome"""
+        ranked = self.names.similar(name, limit=limit if bitmap == self.all_rows else limit * 4)
+        if bitmap != self.all_rows:
+            ranked = [item for item in ranked if bitmap >> item[0] & 1]
+        return [row for row, _ in ranked[:limit]]
+
+class _SnapshotSequence(Sequence):
+    """Coluna do snapshot lida do mapeamento a cada acesso, com sobreposições da sincronização incremental
+
+    Só os valores alterados ou acrescentados por deltas ficam em memória; os do snapshot são
+    decodificados a cada leitura, para que cada worker não mantenha a própria cópia do elenco.
+    """
+
+    def __init__(self, size: int):
+        self._base = size  # Linhas gravadas no snapshot
+        self._size = size
+        self._overrides = {}
+
+    def _decode(self, row: int):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += self._size
+        if row in self._overrides:
+            return self._overrides[row]
+        if not 0 <= row < self._base:
+            raise IndexError(row)
+        return self._decode(row)
+
+    def __setitem__(self, row: int, value):
+        self._overrides[row] = value
+
+    def append(self, value):
+        self._overrides[self._size] = value
+        self._size += 1
+
+    def copy(self) -> '_SnapshotSequence':
+        """Cópia sobre o mesmo mapeamento, com as próprias sobreposições"""
+        sequence = object.__new__(type(self))
+        sequence.__dict__.update(self.__dict__)
+        sequence._overrides = dict(self._overrides)
+        return sequence
+
+class _SnapshotRecords(_SnapshotSequence):
+    """Registros JSON do snapshot, decodificados sob demanda por linha"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        super().__init__(len(offsets) - 1)
+        self._blob = blob
+        self._offsets = offsets
+
+    def _decode(self, row: int) -> Dict:
+        return json.loads(bytes(self._blob[self._offsets[row]:self._offsets[row + 1]]))
+
+class _SnapshotStrings(_SnapshotSequence):
+    """Coluna de strings do snapshot (ids, nomes) lida da tabela de strings sob demanda"""
+
+    def __init__(self, string_ids: memoryview, table: '_StringTable'):
+        super().__init__(len(string_ids))
+        self._string_ids = string_ids
+        self._table = table
+
+    def _decode(self, row: int) -> Optional[str]:
+        return self._table[self._string_ids[row]]
+
+class _StringTable:
+    """Tabela de strings do snapshot: id -> str decodificada do mapeamento (None para NO_STRING)"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, sid: int) -> Optional[str]:
+        if sid == _RosterSnapshot.NO_STRING:
+            return None
+        return str(self._blob[self._offsets[sid]:self._offsets[sid + 1]], "utf-8")
+
+class _RosterSnapshot:
+    """Snapshot binário do elenco (colunas de largura fixa + tabela de strings), mapeado somente leitura
+
+    Layout (seções alinhadas em 8 bytes; colunas na ordem de bytes da máquina, o arquivo é local):
+    cabeçalho | offsets das strings (u64) | strings UTF-8 | colunas (u32/i32/f64 por linha) |
+    offsets dos registros (u64) | registros JSON
+
+    O cabeçalho guarda o CRC32 de todo o restante do arquivo, validado ao abrir. O campo
+    "criado em" é o último momento em que os dados foram confirmados com a API e pode ser
+    regravado no lugar quando uma sincronização não encontra mudanças.
+    """
+
+    MAGIC = b"BPSNAP"
+    VERSION = 4
+    # magic, versão, geração, criado em, linhas, strings, bytes de strings, bytes de registros, CRC32 do corpo
+    HEADER = struct.Struct("<6sHQdIIQQI")
+    CREATED_AT_OFFSET = struct.calcsize("<6sHQ")
+    STRING_COLUMNS = ("id", "name", "position", "serie", "club_name")
+    INT_COLUMNS = ("age", "birth", "contract_end")
+    FLOAT_COLUMNS = ("market_value",)
+    NO_STRING = 0xFFFFFFFF
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.generation, self.created_at, self.size, string_count,
+         strings_bytes, records_bytes, checksum) = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"Snapshot inválido ou de versão incompatível: {path}")
+
+        view = memoryview(self._mmap)
+        if zlib.crc32(view[self.HEADER.size:]) != checksum:
+            raise ValueError(f"Snapshot corrompido (checksum inválido): {path}")
+        offset = _align8(self.HEADER.size)
+        string_offsets = view[offset:offset + 8 * (string_count + 1)].cast("Q")
+        offset += 8 * (string_count + 1)
+        string_blob = view[offset:offset + strings_bytes]
+        offset = _align8(offset + strings_bytes)
+        self.strings = _StringTable(string_blob, string_offsets)
+
+        self._columns = {}
+        for name in self.STRING_COLUMNS + self.INT_COLUMNS + self.FLOAT_COLUMNS:
+            fmt = "I" if name in self.STRING_COLUMNS else "i" if name in self.INT_COLUMNS else "d"
+            width = struct.calcsize(fmt)
+            self._columns[name] = view[offset:offset + width * self.size].cast(fmt)
+            offset = _align8(offset + width * self.size)
+
+        record_offsets = view[offset:offset + 8 * (self.size + 1)].cast("Q")
+        offset += 8 * (self.size + 1)
+        self.records = _SnapshotRecords(view[offset:offset + records_bytes], record_offsets)
+
+    def column(self, name: str) -> memoryview:
+        """Coluna numérica (sem cópia)"""
+        return self._columns[name]
+
+    def string_column(self, name: str) -> Iterable[Optional[str]]:
+        """Valores de uma coluna de strings (None quando ausente), decodificados uma vez por string"""
+        strings, decoded = self.strings, {}
+        for sid in self._columns[name]:
+            value = decoded.get(sid)
+            if value is None:
+                value = decoded[sid] = strings[sid]
+            yield value
+
+    def mapped_strings(self, name: str) -> '_SnapshotStrings':
+        """Coluna de strings sem cópia: cada acesso lê o mapeamento (ids e nomes são quase todos distintos)"""
+        return _SnapshotStrings(self._columns[name], self.strings)
+
+    @classmethod
+    def read_header(cls, path: str) -> Tuple[int, float]:
+        """(geração, confirmado em) gravados no cabeçalho ((0, 0.0) se o arquivo não existe ou é inválido)"""
+        try:
+            with open(path, "rb") as snapshot_file:
+                header = snapshot_file.read(cls.HEADER.size)
+            magic, version, generation, created_at = cls.HEADER.unpack(header)[:4]
+            if magic == cls.MAGIC and version == cls.VERSION:
+                return generation, created_at
+        except (OSError, struct.error):
+            pass
+        return 0, 0.0
+
+    @classmethod
+    def read_generation(cls, path: str) -> int:
+        """Geração gravada no cabeçalho (0 se o arquivo não existe ou é inválido)"""
+        return cls.read_header(path)[0]
+
+    @classmethod
+    def touch(cls, path: str, generation: int, validated_at: float) -> bool:
+        """Marca a geração como confirmada com a API agora (o checksum só cobre o corpo)"""
+        try:
+            with open(path, "r+b") as snapshot_file:
+                if cls.HEADER.unpack(snapshot_file.read(cls.HEADER.size))[2] != generation:
+                    return False
+                snapshot_file.seek(cls.CREATED_AT_OFFSET)
+                snapshot_file.write(struct.pack("<d", validated_at))
+            return True
+        except (OSError, struct.error):
+            return False
+
+    @classmethod
+    def write(cls, path: str, players: List[Dict], generation: int, created_at: float):
+        """Grava o snapshot em arquivo temporário e publica com rename atômico"""
+        string_ids = {}
+        strings = []
+
+        def string_id(value) -> int:
+            if value is None:
+                return cls.NO_STRING
+            value = str(value)
+            sid = string_ids.get(value)
+            if sid is None:
+                sid = string_ids[value] = len(strings)
+                strings.append(value.encode("utf-8"))
+            return sid
+
+        fields = [_player_fields(p) for p in players]
+        columns = {}
+        for i, name in enumerate(PLAYER_FIELDS):
+            if name in cls.STRING_COLUMNS:
+                columns[name] = array("I", (string_id(f[i]) for f in fields))
+            elif name in cls.INT_COLUMNS:
+                columns[name] = array("i", (_RangeColumn.MISSING if f[i] is None else f[i] for f in fields))
+            else:
+                columns[name] = array("d", (f[i] for f in fields))
+
+        string_offsets = array("Q", [0])
+        for encoded in strings:
+            string_offsets.append(string_offsets[-1] + len(encoded))
+        records = [json.dumps(p, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for p in players]
+        record_offsets = array("Q", [0])
+        for encoded in records:
+            record_offsets.append(record_offsets[-1] + len(encoded))
+
+        # Corpo montado em memória para calcular o checksum antes do cabeçalho
+        body = bytearray()
+
+        def pad():
+            body.extend(b"\0" * (_align8(cls.HEADER.size + len(body)) - cls.HEADER.size - len(body)))
+
+        pad()
+        body += string_offsets.tobytes()
+        body += b"".join(strings)
+        pad()
+        for name in cls.STRING_COLUMNS + cls.INT_COLUMNS + cls.FLOAT_COLUMNS:
+            body += columns[name].tobytes()
+            pad()
+        body += record_offsets.tobytes()
+        body += b"".join(records)
+
+        temp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(temp_path, "wb") as out:
+            out.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, generation, created_at, len(players),
+                                      len(strings), string_offsets[-1], record_offsets[-1], zlib.crc32(body)))
+            out.write(body)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, path)
+
+def _align8(offset: int) -> int:
+    """Arredonda o offset para múltiplo de 8"""
+    return (offset + 7) & ~7
+
+EMPTY_STORE = PlayerStore.from_players([])
+
+class _LRUCache:
+    """Cache LRU com TTL (respostas da API, fragmentos renderizados), com cache negativo e coalescência
+
+    Requisições simultâneas da mesma chave esperam a busca em andamento em vez de repeti-la,
+    tanto em threads (get) quanto no loop assíncrono (aget); as duas formas compartilham as entradas.
+    Erros de rede/HTTP (fetch devolve None) não são guardados; 404 (NOT_FOUND) fica por negative_ttl.
+    """
+
+    NOT_FOUND = object()
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # chave -> (expira em, valor)
+        self._inflight = {}  # chave -> Future da busca em andamento
+        self._lock = threading.Lock()
+        self.counters = Counter(hits=0, negative_hits=0, misses=0, coalesced=0, evictions=0, errors=0)
+
+    def _claim(self, key) -> Tuple[bool, object, Optional[Future]]:
+        """(achou, valor, busca) — busca é None se esta chamada deve buscar (a Future já registrada)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.counters["negative_hits" if entry[1] is self.NOT_FOUND else "hits"] += 1
+                return True, entry[1], None
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return False, None, future
+            self._inflight[key] = Future()
+            self.counters["misses"] += 1
+            return False, None, None
+
+    def _settle(self, key, value):
+        """Guarda o resultado da busca e libera quem estava esperando pela mesma chave"""
+        with self._lock:
+            future = self._inflight.pop(key)
+            if value is None:
+                self.counters["errors"] += 1
+            else:
+                ttl = self.negative_ttl if value is self.NOT_FOUND else self.ttl
+                self._entries[key] = (time.time() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.counters["evictions"] += 1
+        if not future.done():  # Cancelada por fora: quem busca não pode falhar por isso
+            future.set_result(value)
+
+    def get(self, key, fetch):
+        """Valor da chave (None se inexistente ou com erro), buscando com fetch() só quando preciso"""
+        found, value, future = self._claim(key)
+        if not found:
+            if future is not None:
+                value = future.result()
+            else:
+                value = None
+                try:
+                    value = fetch()
+                finally:
+                    self._settle(key, value)
+        return None if value is self.NOT_FOUND else value
+
+    async def aget(self, key, fetch):
+        """Versão assíncrona de get: fetch() é uma corrotina e a espera não bloqueia o loop"""
+        found, value, future = self._claim(key)
+        if not found:
+            if future is not None:
+                # shield: cancelar este waiter não cancela a busca compartilhada com os demais
+                value = await asyncio.shield(asyncio.wrap_future(future))
+            else:
+                value = None
+                try:
+                    value = await fetch()
+                finally:
+                    self._settle(key, value)
+        return None if value is self.NOT_FOUND else value
+
+    def clear(self):
+        """Descarta as entradas guardadas (buscas em andamento seguem e são guardadas ao terminar)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Contadores de acerto/erro e ocupação atual"""
+        with self._lock:
+            return {**self.counters, "size": len(self._entries), "max_size": self.max_size}
+
 class APIClient:
     """Cliente para comunicação com a API"""
     
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, cache_ttl: float = PLAYERS_CACHE_TTL,
+                 cache_ttl_jitter: float = PLAYERS_CACHE_TTL_JITTER,
+                 snapshot_dir: Optional[str] = PLAYERS_SNAPSHOT_DIR):
         self.base_url = base_url
-        self._players_cache = None  # Cache dos jogadores
+        self.cache_ttl = cache_ttl
+        self.cache_ttl_jitter = cache_ttl_jitter
+        self.snapshot_dir = snapshot_dir or None
+        self._next_snapshot_check = 0.0
+        self._store = None  # Snapshot atual: jogadores + índices colunares
         self._cache_timestamp = None
-        
-    def _load_all_players(self):
-        """Carrega todos os jogadores da API e mantém em cache"""
+        self._cache_expires_at = 0.0
+        # Garante uma única atualização por processo (single-flight)
+        self._refresh_lock = threading.Lock()
+        self.last_fetch_report = None  # Relatório da última carga de /players
+        self._page_cache = {}  # offset -> (ETag, jogadores) para requisições condicionais
+        self._session = self._create_session()
+        # Perfil e estatísticas: cache por jogador e pool para buscar em paralelo (também em lote)
+        self._details_cache = _LRUCache(PLAYER_DETAILS_CACHE_SIZE, PLAYER_DETAILS_CACHE_TTL,
+                                        PLAYER_DETAILS_NEGATIVE_TTL)
+        self._details_executor = ThreadPoolExecutor(max_workers=PLAYER_DETAILS_CONCURRENCY,
+                                                    thread_name_prefix="player-details")
+    
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Sessão HTTP compartilhada com pool de conexões (keep-alive) e retentativas"""
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(["GET"]))
+        pool_maxsize = max(10, PLAYERS_FETCH_CONCURRENCY * 2, PLAYER_DETAILS_CONCURRENCY)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def _next_expiry(self, now: float) -> float:
+        """Próxima expiração do cache com jitter (evita expirações simultâneas entre workers)"""
+        jitter = random.uniform(-self.cache_ttl_jitter, self.cache_ttl_jitter)
+        return now + self.cache_ttl * (1 + jitter)
+    
+    @property
+    def _snapshot_path(self) -> Optional[str]:
+        return os.path.join(self.snapshot_dir, "players.snapshot") if self.snapshot_dir else None
+    
+    def _try_lock_snapshot(self) -> Optional[int]:
+        """Lock entre processos para a atualização (descritor, ou None se outro processo atualiza)"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.snapshot_dir, "players.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return None
+        return fd
+    
+    def _attach_snapshot(self, max_age: Optional[float] = None) -> bool:
+        """Passa a servir o snapshot compartilhado, se for mais novo que o atual (e recente o bastante)"""
+        path = self._snapshot_path
+        if not path:
+            return False
+        store = self._store
+        current = store.generation if store is not None else 0
+        generation, validated_at = _RosterSnapshot.read_header(path)
+        if generation == current and store is not None and validated_at > store.created_at:
+            # Mesma geração reconfirmada por outro worker (sincronização sem mudanças)
+            if max_age is not None and time.time() - validated_at >= max_age:
+                return False
+            store.created_at = validated_at
+            self._cache_timestamp = validated_at
+            self._cache_expires_at = self._next_expiry(validated_at)
+            return True
+        if generation <= current:
+            return False
         try:
-            # Cache válido por 5 minutos
-            import time
-            current_time = time.time()
-            if (self._players_cache is not None and 
-                self._cache_timestamp is not None and 
-                current_time - self._cache_timestamp < 300):
-                return self._players_cache
-            
-            print("🔄 Carregando todos os jogadores da API...")
-            all_players = []
-            
-            # Carrega jogadores em páginas
-            offset = 0
-            page_size = 1000
-            
-            while True:
-                params = {"limit": page_size, "offset": offset}
-                response = requests.get(f"{self.base_url}/players", params=params, timeout=10)
-                if response.status_code == 200:
-                    players = response.json()
-                    if not players:
-                        break
-                    all_players.extend(players)
-                    if len(players) < page_size:
-                        break
-                    offset += page_size
+            snapshot = _RosterSnapshot(path)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Erro ao abrir snapshot compartilhado: %s", e)
+            return False
+        if max_age is not None and time.time() - snapshot.created_at >= max_age:
+            return False
+        store = PlayerStore.from_snapshot(snapshot)
+        store.prepare_orders()
+        self._store = store
+        self._cache_timestamp = snapshot.created_at
+        self._cache_expires_at = self._next_expiry(snapshot.created_at)
+        logger.info("✅ Snapshot compartilhado geração %d (%d jogadores)", snapshot.generation, snapshot.size)
+        return True
+    
+    def _publish_snapshot(self, players: List[Dict], created_at: float) -> Optional[PlayerStore]:
+        """Grava uma nova geração do snapshot e o mapeia (None se o diretório não estiver disponível)"""
+        path = self._snapshot_path
+        current = self._store.generation if self._store is not None else 0
+        generation = max(_RosterSnapshot.read_generation(path), current) + 1
+        try:
+            _RosterSnapshot.write(path, players, generation, created_at)
+            return PlayerStore.from_snapshot(_RosterSnapshot(path))
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Erro ao gravar snapshot compartilhado: %s", e)
+            return None
+    
+    @timed("roster.page")
+    def _fetch_players_page(self, offset: int) -> Tuple[Optional[List[Dict]], Optional[str], Optional[int],
+                                                         Optional[Tuple[Optional[str], List[Dict]]]]:
+        """Busca uma página de /players: (jogadores, erro, total informado pela API, página nova)
+
+        Páginas já vistas são pedidas com If-None-Match; um 304 reaproveita a versão guardada.
+        Página nova é (ETag, jogadores) quando a página mudou: só entra em _page_cache depois que
+        o elenco for atualizado com ela (ver _commit_pages).
+        """
+        try:
+            params = {"limit": PLAYERS_PAGE_SIZE, "offset": offset}
+            cached = self._page_cache.get(offset)
+            headers = {"If-None-Match": cached[0]} if cached else None
+            response = self._session.get(f"{self.base_url}/players", params=params, headers=headers, timeout=10)
+            total = response.headers.get(PLAYERS_TOTAL_COUNT_HEADER)
+            total = int(total) if total and total.isdigit() else None
+            if response.status_code == 304 and cached:
+                UPSTREAM_REQUESTS.inc(resource="players", outcome="not_modified")
+                return cached[1], None, total, None
+            if response.status_code != 200:
+                UPSTREAM_REQUESTS.inc(resource="players", outcome="error")
+                return None, f"HTTP {response.status_code}", None, None
+            players = response.json()
+            UPSTREAM_REQUESTS.inc(resource="players", outcome="ok")
+            return players, None, total, (response.headers.get("ETag"), players)
+        except Exception as e:
+            UPSTREAM_REQUESTS.inc(resource="players", outcome="error")
+            return None, str(e), None, None
+    
+    def _commit_pages(self, page_updates: Dict[int, Optional[Tuple[Optional[str], List[Dict]]]]):
+        """Guarda as ETags das páginas novas (None: página não existe mais) depois que o elenco as absorveu
+
+        Uma carga descartada não chama isto: se as ETags novas ficassem guardadas, a próxima
+        revalidação receberia 304 dessas páginas e nunca compararia os jogadores que mudaram.
+        """
+        for offset, page in page_updates.items():
+            if page is None or not page[0]:
+                self._page_cache.pop(offset, None)
+            else:
+                self._page_cache[offset] = page
+    
+    def _fetch_all_players(self) -> Tuple[List[Dict], Dict, List[Dict], Dict]:
+        """Busca todos os jogadores da API com páginas em paralelo
+
+        Devolve (jogadores, relatório, jogadores das páginas que mudaram, páginas para _commit_pages).
+        """
+        logger.info("🔄 Carregando todos os jogadores da API...")
+        page_size = PLAYERS_PAGE_SIZE
+        
+        # A primeira página informa o total (se a API enviar o header) e valida a conexão
+        first_page, error, total, new_page = self._fetch_players_page(0)
+        if first_page is None:
+            raise RuntimeError(f"Erro ao carregar jogadores: {error}")
+        
+        pages = {0: first_page}
+        page_updates = {0: new_page} if new_page else {}
+        failed = {}
+        
+        def collect(offset, result) -> Optional[List[Dict]]:
+            players, error, _, new_page = result
+            if players is None:
+                failed[offset] = error
+            else:
+                pages[offset] = players
+                if new_page:
+                    page_updates[offset] = new_page
+            return players
+        
+        if len(first_page) == page_size:
+            with ThreadPoolExecutor(max_workers=PLAYERS_FETCH_CONCURRENCY) as executor:
+                if total is not None:
+                    # Total conhecido: agenda todas as páginas de uma vez
+                    offsets = list(range(page_size, total, page_size))
+                    for offset, result in zip(offsets, executor.map(self._fetch_players_page, offsets)):
+                        collect(offset, result)
                 else:
-                    print(f"❌ Erro ao carregar jogadores: {response.status_code}")
-                    break
-            
-            self._players_cache = all_players
-            self._cache_timestamp = current_time
-            print(f"✅ Carregados {len(all_players)} jogadores no cache")
-            return all_players
-            
+                    # Sem total: sonda em lotes até encontrar uma página incompleta
+                    next_offset = page_size
+                    while True:
+                        offsets = [next_offset + i * page_size for i in range(PLAYERS_FETCH_CONCURRENCY)]
+                        results = list(executor.map(self._fetch_players_page, offsets))
+                        reached_end = False
+                        for offset, result in zip(offsets, results):
+                            players = collect(offset, result)
+                            if players is not None and len(players) < page_size:
+                                reached_end = True
+                                break
+                        # Lote inteiro com erro: não há como saber onde os dados terminam
+                        if reached_end or all(result[0] is None for result in results):
+                            break
+                        next_offset = offsets[-1] + page_size
+        
+        # Páginas além do fim atual não existem mais
+        last_offset = max(pages)
+        for offset in [offset for offset in self._page_cache if offset > last_offset]:
+            page_updates[offset] = None
+        
+        all_players = []
+        changed = []
+        for offset in sorted(pages):
+            all_players.extend(pages[offset])
+            if page_updates.get(offset):
+                changed.extend(pages[offset])
+        
+        modified_pages = sum(1 for offset in pages if page_updates.get(offset))
+        report = {
+            "pages": len(pages),
+            "not_modified_pages": len(pages) - modified_pages,
+            "players": len(all_players),
+            "total": total,
+            "failed_pages": [{"offset": offset, "error": error} for offset, error in sorted(failed.items())],
+            "complete": not failed,
+            "timestamp": time.time()
+        }
+        for page in report["failed_pages"]:
+            logger.error("❌ Erro ao carregar jogadores (offset %d): %s", page['offset'], page['error'])
+        return all_players, report, changed, page_updates
+    
+    def _refresh_cache(self):
+        """Recarrega o cache e troca o snapshot atomicamente (chamar com o lock adquirido)"""
+        if not self.snapshot_dir:
+            self._refresh_from_api()
+            return
+        
+        # Outro worker pode já ter publicado uma geração recente
+        if self._attach_snapshot(max_age=self.cache_ttl):
+            return
+        try:
+            lock_fd = self._try_lock_snapshot()
+        except OSError as e:
+            logger.warning("⚠️ Snapshot compartilhado indisponível (%s), usando cache local", e)
+            self._refresh_from_api(publish=False)
+            return
+        if lock_fd is None:
+            # Outro processo está buscando na API: aguarda a nova geração
+            if self._store is None:
+                self._wait_for_snapshot()
+            else:
+                self._cache_expires_at = time.time() + PLAYERS_SNAPSHOT_POLL_INTERVAL
+            return
+        try:
+            if not self._attach_snapshot(max_age=self.cache_ttl):
+                self._refresh_from_api()
+        finally:
+            os.close(lock_fd)
+    
+    def _wait_for_snapshot(self):
+        """Primeira carga enquanto outro processo busca na API: espera o lock e mapeia o snapshot"""
+        lock_fd = os.open(os.path.join(self.snapshot_dir, "players.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            if not self._attach_snapshot():
+                self._refresh_from_api()
+        finally:
+            os.close(lock_fd)
+    
+    @timed("roster.refresh")
+    def _refresh_from_api(self, publish: bool = True):
+        """Busca o elenco na API e troca o snapshot (publicando para os outros workers)"""
+        now = time.time()
+        retry_at = now + min(self.cache_ttl, PLAYERS_CACHE_RETRY_DELAY)
+        try:
+            all_players, report, changed, page_updates = self._fetch_all_players()
         except Exception as e:
-            print(f"❌ Erro ao carregar todos os jogadores: {e}")
-            return []
+            logger.error("❌ Erro ao carregar todos os jogadores: %s", e)
+            ROSTER_REFRESHES.inc(result="error")
+            self.last_fetch_report = {"complete": False, "error": str(e), "timestamp": now}
+            # Mantém o snapshot antigo e tenta de novo em breve
+            self._cache_expires_at = retry_at
+            return
+        
+        self.last_fetch_report = report
+        if not report["complete"] and self._store is not None:
+            # Carga parcial não substitui um snapshot completo (e as ETags novas são descartadas)
+            logger.warning("⚠️ Carga parcial (%d página(s) com erro), mantendo o cache atual",
+                           len(report['failed_pages']))
+            ROSTER_REFRESHES.inc(result="partial")
+            self._cache_expires_at = retry_at
+            return
+        
+        if self._store is not None and self._sync_delta(all_players, changed, now, publish):
+            self._commit_pages(page_updates)
+            return
+        
+        store = None
+        if publish and self.snapshot_dir and report["complete"]:
+            store = self._publish_snapshot(all_players, now)
+        if store is None:
+            generation = self._store.generation + 1 if self._store is not None else 1
+            store = PlayerStore.from_players(all_players, generation=generation, created_at=now)
+        store.prepare_orders()
+        self._store = store
+        self._commit_pages(page_updates)
+        self._cache_timestamp = now
+        # Carga parcial (sem snapshot anterior) é servida, mas revalidada em breve
+        self._cache_expires_at = self._next_expiry(now) if report["complete"] else retry_at
+        ROSTER_REFRESHES.inc(result="full")
+        logger.info("✅ Carregados %d jogadores no cache", len(all_players))
+    
+    def _sync_delta(self, all_players: List[Dict], changed: List[Dict], now: float, publish: bool) -> bool:
+        """Aplica só o que mudou no armazenamento atual (False se for preciso recarregar tudo)"""
+        store = self._store
+        delta = store.diff(all_players, changed)
+        if delta is None:
+            logger.warning("⚠️ Delta indisponível (ids ausentes ou repetidos), recarregando tudo")
+            return False
+        upserts, removed = delta
+        if len(upserts) + len(removed) > PLAYERS_DELTA_MAX_FRACTION * max(store.count, 1):
+            # Mudança grande demais: reconstruir os índices sai mais barato
+            return False
+        
+        published = self.snapshot_dir and publish
+        if upserts or removed:
+            # Delta numa cópia, publicada de uma vez: requisições em andamento seguem na versão antiga
+            store = store.with_delta(upserts, removed)
+            store.prepare_orders()
+            if published:
+                # Os outros workers recebem a nova geração completa pelo snapshot
+                generation = max(_RosterSnapshot.read_generation(self._snapshot_path), store.generation) + 1
+                try:
+                    _RosterSnapshot.write(self._snapshot_path, all_players, generation, now)
+                    store.generation = generation
+                except OSError as e:
+                    logger.warning("⚠️ Erro ao gravar snapshot compartilhado: %s", e)
+        elif published:
+            _RosterSnapshot.touch(self._snapshot_path, store.generation, now)
+        
+        store.created_at = now
+        self._store = store
+        self._cache_timestamp = now
+        self._cache_expires_at = self._next_expiry(now)
+        ROSTER_REFRESHES.inc(result="delta")
+        logger.info("🔁 Sincronização incremental: %d alterados/novos, %d removidos (%d página(s) sem mudança)",
+                    len(upserts), len(removed), self.last_fetch_report['not_modified_pages'])
+        return True
+    
+    def _refresh_in_background(self):
+        """Dispara a revalidação em uma thread, se nenhuma estiver em andamento"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        
+        def run():
+            try:
+                self._refresh_cache()
+            finally:
+                self._refresh_lock.release()
+        
+        threading.Thread(target=run, name="players-cache-refresh", daemon=True).start()
+    
+    def _get_store(self) -> PlayerStore:
+        """Snapshot atual do elenco (stale-while-revalidate)"""
+        store = self._store
+        if store is not None:
+            now = time.time()
+            # Cache expirado: continua servindo o snapshot antigo enquanto atualiza
+            if now >= self._cache_expires_at:
+                self._refresh_in_background()
+            elif self.snapshot_dir and now >= self._next_snapshot_check:
+                # Outro worker publicou uma geração nova: mapeia em segundo plano
+                self._next_snapshot_check = now + PLAYERS_SNAPSHOT_POLL_INTERVAL
+                if _RosterSnapshot.read_generation(self._snapshot_path) > store.generation:
+                    self._refresh_in_background()
+            return store
+        
+        # Sem snapshot ainda: a primeira requisição espera a carga (as demais aguardam o lock)
+        with self._refresh_lock:
+            if self._store is None and time.time() >= self._cache_expires_at:
+                # Partida a quente: serve o último snapshot bom do disco, mesmo expirado
+                if not self._attach_snapshot():
+                    self._refresh_cache()
+        store = self._store
+        if store is None:
+            return EMPTY_STORE
+        if time.time() >= self._cache_expires_at:
+            # Snapshot do disco já expirado: revalida sem segurar esta requisição
+            self._refresh_in_background()
+        return store
+    
+    def snapshot_info(self) -> Optional[Dict]:
+        """Geração, idade e estado do snapshot em uso (None se nada foi carregado ainda)"""
+        store = self._store
+        if store is None:
+            return None
+        age = max(0.0, time.time() - store.created_at)
+        return {
+            "generation": store.generation,
+            "created_at": store.created_at,
+            "age": age,
+            "stale": age >= self.cache_ttl,
+            "players": store.count
+        }
+    
+    def _load_all_players(self) -> List[Dict]:
+        """Carrega todos os jogadores da API e mantém em cache"""
+        return self._get_store().live_records()
     
+    def search_rows(self, name: Optional[str] = None, position: Optional[str] = None,
+                    serie: Optional[str] = None, club: Optional[str] = None,
+                    age_min: Optional[int] = None, age_max: Optional[int] = None,
+                    fuzzy: bool = False, contract_end_max: Optional[int] = None,
+                    contract_end_min: Optional[int] = None, birth_min: Optional[int] = None,
+                    birth_max: Optional[int] = None, market_value_min: Optional[float] = None,
+                    market_value_max: Optional[float] = None
+                    ) -> Tuple[PlayerStore, int, Optional[List[int]]]:
+        """Busca local sem montar registros: (armazenamento, bitmap dos filtros, linhas da busca por nome)
+
+        Sem filtro de nome as linhas ficam como None e o bitmap já é o resultado.
+        """
+        store = self._get_store()
+        
+        # Filtros de igualdade e faixas (idade, fim de contrato, valor de mercado): intersecção de bitmaps
+        with span("search.filters"):
+            bitmap = store.match(
+                position=position,
+                serie=serie,
+                club=club,
+                age_min=age_min,
+                age_max=age_max,
+                contract_end_max=contract_end_max,
+                contract_end_min=contract_end_min,
+                birth_min=birth_min,
+                birth_max=birth_max,
+                market_value_min=market_value_min,
+                market_value_max=market_value_max
+            )
+        
+        # Filtro por nome: índice de trigramas (parcial ou aproximado, sem acentos)
+        rows = None
+        if name and name.strip():
+            with span("search.name_fuzzy" if fuzzy else "search.name"):
+                if fuzzy:
+                    rows = store.rank_name(name.strip(), bitmap)
+                else:
+                    rows = store.search_name(name.strip(), bitmap)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            found = len(rows) if rows is not None else _popcount(bitmap)
+            logger.debug("🔍 Busca local finalizada: %d de %d jogadores", found, store.count)
+        return store, bitmap, rows
+
+    @timed("search.facets")
+    def search_rows_and_facets(self, name: Optional[str] = None, fuzzy: bool = False, **filters
+                               ) -> Tuple[PlayerStore, int, Optional[List[int]], Dict]:
+        """search_rows e as contagens por faceta com uma só busca por nome: (armazenamento, bitmap, linhas, facetas)
+
+        Sem fuzzy, as linhas que casam com o nome no elenco inteiro servem à busca (com todos os
+        filtros) e a cada faceta (com os demais filtros). Com fuzzy o ranking (top 100) depende
+        dos filtros: cada faceta com filtro ativo é contada sobre o ranking sem o próprio filtro.
+        """
+        store = self._get_store()
+        with span("search.filters"):
+            filter_bitmaps = store.filter_bitmaps(**filters)
+            bitmap = store.all_rows
+            for filter_bitmap in filter_bitmaps.values():
+                bitmap &= filter_bitmap
+        name = name.strip() if name else None
+        if not name:
+            return store, bitmap, None, store.facets(filter_bitmaps, store.all_rows)
+        if not fuzzy:
+            with span("search.name"):
+                matches = store.name_matches(name)
+            return store, bitmap, store.rows(bitmap & matches), store.facets(filter_bitmaps, matches)
+        with span("search.name_fuzzy"):
+            rows = store.rank_name(name, bitmap)
+        ranked = {bitmap: _rows_to_bitmap(rows, store.size)}  # bitmap dos filtros -> linhas do ranking
+
+        def ranked_rows(base: int) -> int:
+            if base not in ranked:
+                ranked[base] = _rows_to_bitmap(store.rank_name(name, base), store.size)
+            return ranked[base]
+
+        return store, bitmap, rows, store.facets(filter_bitmaps, ranked_rows)
+
+    def search_facets(self, name: Optional[str] = None, fuzzy: bool = False, **filters) -> Dict:
+        """Contagens por faceta da busca (mesmos parâmetros de search_rows) por popcount de bitmaps"""
+        return self.search_rows_and_facets(name, fuzzy, **filters)[3]
+
+    @timed("search.similar")
+    def similar_players(self, player_id: str, limit: int = PLAYERS_SIMILAR_LIMIT, name: Optional[str] = None,
+                        fuzzy: bool = False, **filters) -> Tuple[PlayerStore, Optional[int], List[Tuple[int, float]]]:
+        """Jogadores mais parecidos com o informado entre os que passam nos filtros (parâmetros de search_rows)
+
+        Devolve (armazenamento, linha do jogador ou None se ele não existe, lista de (linha, distância)).
+        """
+        store, bitmap, rows = self.search_rows(name, fuzzy=fuzzy, **filters)
+        if rows is not None:
+            bitmap = _rows_to_bitmap(rows, store.size)
+        rows_by_id = store.rows_by_id()
+        row = rows_by_id.get(player_id) if rows_by_id is not None else None
+        if row is None:
+            return store, None, []
+        return store, row, store.similarity_index().nearest(row, bitmap, limit)
+
     def search_players_local(self, name: Optional[str] = None, position: Optional[str] = None,
                            serie: Optional[str] = None, club: Optional[str] = None,
-                           age_min: Optional[int] = None, age_max: Optional[int] = None) -> List[Dict]:
-        """Busca local nos dados carregados da API"""
+                           age_min: Optional[int] = None, age_max: Optional[int] = None,
+                           fuzzy: bool = False) -> List[Dict]:
+        """Busca local nos dados carregados da API (fuzzy=True ordena por similaridade do nome)"""
         try:
-            # Carrega todos os jogadores
-            all_players = self._load_all_players()
-            filtered = all_players.copy()
-            
-            print(f"🔍 Iniciando busca local com {len(filtered)} jogadores")
-            
-            # Filtro por nome (busca parcial, case-insensitive)
-            if name and name.strip():
-                name_lower = name.strip().lower()
-                filtered = [p for p in filtered if name_lower in p.get("name", "").lower()]
-                print(f"📝 Filtro por nome '{name}': {len(filtered)} jogadores")
-            
-            # Filtro por posição
-            if position and position.strip():
-                filtered = [p for p in filtered if p.get("position") == position.strip()]
-                print(f"⚽ Filtro por posição '{position}': {len(filtered)} jogadores")
-            
-            # Filtro por série
-            if serie and serie.strip():
-                filtered = [p for p in filtered if p.get("serie") == serie.strip()]
-                print(f"🏆 Filtro por série '{serie}': {len(filtered)} jogadores")
-            
-            # Filtro por clube
-            if club and club.strip():
-                filtered = [p for p in filtered if p.get("club_name") == club.strip()]
-                print(f"🛡️ Filtro por clube '{club}': {len(filtered)} jogadores")
-            
-            # Filtro por idade mínima
-            if age_min is not None:
-                filtered = [p for p in filtered if p.get("age") is not None and p.get("age") >= age_min]
-                print(f"📅 Filtro idade mínima {age_min}: {len(filtered)} jogadores")
-            
-            # Filtro por idade máxima
-            if age_max is not None:
-                filtered = [p for p in filtered if p.get("age") is not None and p.get("age") <= age_max]
-                print(f"📅 Filtro idade máxima {age_max}: {len(filtered)} jogadores")
-            
-            print(f"✅ Busca local finalizada: {len(filtered)} jogadores encontrados")
-            return filtered
+            store, bitmap, rows = self.search_rows(name, position, serie, club, age_min, age_max, fuzzy)
+            if rows is None:
+                rows = store.rows(bitmap)
+            records = store.records
+            return [records[row] for row in rows]
             
         except Exception as e:
-            print(f"❌ Erro na busca local: {e}")
+            logger.error("❌ Erro na busca local: %s", e)
             return []
         
     def get_players(self, limit: int = 100, offset: int = 0, serie: Optional[str] = None, 
@@ -127,7 +2041,7 @@ class APIClient:
     def search_players(self, name: Optional[str] = None, position: Optional[str] = None,
                       serie: Optional[str] = None, club: Optional[str] = None,
                       age_min: Optional[int] = None, age_max: Optional[int] = None,
-                      limit: int = 100) -> List[Dict]:
+                      limit: int = 100, fuzzy: bool = False) -> List[Dict]:
         """Busca avançada de jogadores - agora usa busca local"""
         try:
             results = self.search_players_local(
@@ -136,87 +2050,144 @@ class APIClient:
                 serie=serie,
                 club=club,
                 age_min=age_min,
-                age_max=age_max
+                age_max=age_max,
+                fuzzy=fuzzy
             )
             return results[:limit] if limit else results
         except Exception as e:
-            print(f"❌ Erro na busca avançada: {e}")
+            logger.error("❌ Erro na busca avançada: %s", e)
             return []
     
-    def get_player_profile(self, player_id: str) -> Optional[Dict]:
-        """Busca perfil de um jogador específico"""
+    def _fetch_player_resource(self, player_id: str, resource: str, timeout: float):
+        """GET de /players/<id>/<resource>: JSON, NOT_FOUND (404) ou None em caso de erro"""
         try:
-            response = requests.get(f"{self.base_url}/players/{player_id}/profile", timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            return None
+            with span(f"upstream.{resource}"):
+                response = self._session.get(f"{self.base_url}/players/{player_id}/{resource}", timeout=timeout)
+                if response.status_code == 200:
+                    data = response.json()
+                    UPSTREAM_REQUESTS.inc(resource=resource, outcome="ok")
+                    return data
+            if response.status_code == 404:
+                UPSTREAM_REQUESTS.inc(resource=resource, outcome="not_found")
+                return _LRUCache.NOT_FOUND
+            logger.warning("Erro ao buscar %s do jogador %s: HTTP %d", resource, player_id, response.status_code)
         except Exception as e:
-            print(f"Erro ao buscar perfil do jogador {player_id}: {e}")
-            return None
+            logger.warning("Erro ao buscar %s do jogador %s: %s", resource, player_id, e)
+        UPSTREAM_REQUESTS.inc(resource=resource, outcome="error")
+        return None
+    
+    def get_player_profile(self, player_id: str) -> Optional[Dict]:
+        """Busca perfil de um jogador específico (cache por jogador)"""
+        return self._details_cache.get(("profile", player_id),
+                                       lambda: self._fetch_player_resource(player_id, "profile", 10))
     
     def get_player_stats(self, player_id: str) -> Optional[Dict]:
-        """Busca estatísticas de um jogador"""
-        try:
-            response = requests.get(f"{self.base_url}/players/{player_id}/stats", timeout=15)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Erro ao buscar estatísticas do jogador {player_id}: {e}")
-            return None
+        """Busca estatísticas de um jogador, já agrupadas por temporada em 'summary' (cache por jogador)"""
+        return self._details_cache.get(
+            ("stats", player_id), lambda: with_stats_summary(self._fetch_player_resource(player_id, "stats", 15)))
+    
+    def get_player_details(self, player_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Perfil e estatísticas buscados em paralelo: (perfil, estatísticas)"""
+        stats_future = self._details_executor.submit(self.get_player_stats, player_id)
+        profile = self.get_player_profile(player_id)
+        return profile, stats_future.result()
+    
+    def get_players_details(self, player_ids: Sequence[str]) -> List[Tuple[Optional[Dict], Optional[Dict]]]:
+        """Perfil e estatísticas de vários jogadores em um lote: (perfil, estatísticas) na ordem dos ids
+
+        Todas as chamadas saem juntas pelo pool (até PLAYER_DETAILS_CONCURRENCY simultâneas, na
+        mesma sessão HTTP); entradas em cache voltam sem ir à API e buscas já em andamento são
+        compartilhadas, então o lote custa em torno da chamada mais lenta.
+        """
+        submit = self._details_executor.submit
+        futures = [(submit(self.get_player_profile, player_id), submit(self.get_player_stats, player_id))
+                   for player_id in player_ids]
+        return [(profile.result(), stats.result()) for profile, stats in futures]
+    
+    def details_cache_stats(self) -> Dict:
+        """Contadores do cache de perfil/estatísticas"""
+        return self._details_cache.stats()
     
     def get_series_info(self) -> List[Dict]:
-        """Busca informações das séries a partir dos jogadores carregados"""
+        """Busca informações das séries a partir dos jogadores carregados (calculadas uma vez por versão)"""
         try:
-            players = self._load_all_players()
-            series_count = {}
-            
-            for player in players:
-                serie = player.get("serie", "Sem Série")
-                series_count[serie] = series_count.get(serie, 0) + 1
-            
-            # Retorna no formato esperado
-            series_info = []
-            for serie, count in sorted(series_count.items()):
-                series_info.append({
-                    "name": serie,
-                    "players_count": count
-                })
-            
-            return series_info
+            store = self._get_store()
+            return store.memo(("series",), lambda: self._series_info(store))
         except Exception as e:
-            print(f"Erro ao buscar séries: {e}")
+            logger.error("Erro ao buscar séries: %s", e)
             return []
     
     def get_clubs_info(self, serie: Optional[str] = None) -> List[Dict]:
-        """Busca informações dos clubes a partir dos jogadores carregados"""
+        """Busca informações dos clubes a partir dos jogadores carregados (calculadas uma vez por versão)"""
         try:
-            players = self._load_all_players()
-            clubs_count = {}
-            
-            for player in players:
-                # Filtra por série se especificado
-                if serie and player.get("serie") != serie:
-                    continue
-                    
-                club = player.get("club_name", "Sem Clube")
-                if club not in clubs_count:
-                    clubs_count[club] = {
-                        "name": club,
-                        "serie": player.get("serie", ""),
-                        "players_count": 0
-                    }
-                clubs_count[club]["players_count"] += 1
-            
-            # Retorna lista ordenada
-            return sorted(clubs_count.values(), key=lambda x: x["name"])
+            store = self._get_store()
+            return store.memo(("clubs", serie), lambda: self._clubs_info(store, serie))
         except Exception as e:
-            print(f"Erro ao buscar clubes: {e}")
+            logger.error("Erro ao buscar clubes: %s", e)
             return []
+    
+    def get_club_names_json(self, serie: str) -> Tuple[bytes, str, float]:
+        """Nomes dos clubes da série já serializados em JSON, com ETag e data da última alteração"""
+        store = self._get_store()
+        
+        def build():
+            clubs = store.memo(("clubs", serie), lambda: self._clubs_info(store, serie))
+            body = json.dumps([club["name"] for club in clubs]).encode()
+            return body, hashlib.sha1(body).hexdigest()
+        
+        body, etag = store.memo(("club_names_json", serie), build)
+        return body, etag, store.modified_at
+    
+    @staticmethod
+    def _series_info(store: PlayerStore) -> List[Dict]:
+        """Contagem de jogadores por série"""
+        series_count = {}
+        
+        # Contagem direta pelos bitmaps da coluna de série
+        for serie, bitmap in zip(store.serie.values, store.serie.bitmaps):
+            serie = serie if serie is not None else "Sem Série"
+            series_count[serie] = series_count.get(serie, 0) + _popcount(bitmap)
+        
+        # Retorna no formato esperado
+        series_info = []
+        for serie, count in sorted(series_count.items()):
+            series_info.append({
+                "name": serie,
+                "players_count": count
+            })
+        
+        return series_info
+    
+    @staticmethod
+    def _clubs_info(store: PlayerStore, serie: Optional[str] = None) -> List[Dict]:
+        """Clubes (com série e contagem de jogadores), filtrados pela série se informada"""
+        serie_bitmap = store.serie.match(serie) if serie else store.all_rows
+        clubs_count = {}
+        
+        for club, bitmap in zip(store.club.values, store.club.bitmaps):
+            bitmap &= serie_bitmap
+            if not bitmap:
+                continue
+            club = club if club is not None else "Sem Clube"
+            # Série do primeiro jogador do clube (menor linha do bitmap)
+            first_row = (bitmap & -bitmap).bit_length() - 1
+            if club not in clubs_count:
+                clubs_count[club] = {
+                    "name": club,
+                    "serie": store.serie.values[store.serie.codes[first_row]] or "",
+                    "players_count": 0
+                }
+            clubs_count[club]["players_count"] += _popcount(bitmap)
+        
+        # Retorna lista ordenada
+        return sorted(clubs_count.values(), key=lambda x: x["name"])
 
 # Cliente da API
 api_client = APIClient(API_BASE_URL)
 
+# Conteúdo renderizado da página principal por filtros + versão do elenco
+index_fragment_cache = _LRUCache(INDEX_FRAGMENT_CACHE_SIZE, ttl=24 * 3600, negative_ttl=0)
+
 def parse_date(date_str: str) -> Optional[datetime]:
     """Converte string de data para datetime"""
     if not date_str:
@@ -229,56 +2200,215 @@ def parse_date(date_str: str) -> Optional[datetime]:
         except:
             return None
 
+def normalize_serie(serie: Optional[str]) -> str:
+    """Normaliza o nome da série para 'Série A'...'Série D' (outros valores ficam como estão)"""
+    serie = serie or 'Outras Séries'
+    serie_lower = serie.lower()
+    for letter in 'abcd':
+        if f'série {letter}' in serie_lower or serie_lower == letter:
+            return f'Série {letter.upper()}'
+    return serie
+
+def parse_market_value(value) -> Optional[float]:
+    """Converte o valor de mercado da API em número ('€1.50m', '€700k', 'R$ 7.000.000', 1200000)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value or value == 'N/A':
+        return None
+    match = _MARKET_VALUE_RE.search(str(value).lower())
+    if not match:
+        return None
+    number, suffix = match.group(1), match.group(2)
+    # Separador decimal: o último entre '.' e ',' quando há os dois; sozinho, só se não parecer milhar
+    if '.' in number and ',' in number:
+        decimal = '.' if number.rfind('.') > number.rfind(',') else ','
+        number = number.replace(',' if decimal == '.' else '.', '').replace(',', '.')
+    else:
+        separator = '.' if '.' in number else ',' if ',' in number else None
+        if separator:
+            integer, _, fraction = number.rpartition(separator)
+            if number.count(separator) > 1 or (len(fraction) == 3 and not suffix):
+                number = number.replace(separator, '')
+            else:
+                number = f"{integer.replace(separator, '')}.{fraction}"
+    try:
+        return float(number) * _MARKET_VALUE_MULTIPLIERS.get(suffix, 1)
+    except ValueError:
+        return None
+
+_MARKET_VALUE_RE = re.compile(r'(\d[\d.,]*)\s*(bn|bi|mil|mio|mi|m|k)?')
+_MARKET_VALUE_MULTIPLIERS = {'k': 1e3, 'mil': 1e3, 'm': 1e6, 'mi': 1e6, 'mio': 1e6, 'bn': 1e9, 'bi': 1e9}
+
+def contract_end_date(player: Dict) -> Optional[datetime]:
+    """Data de fim do contrato nos formatos possíveis da API"""
+    # Formato: {"until": "data"} ou string com data direta
+    contract_data = player.get('contract')
+    contract_end = None
+    if isinstance(contract_data, dict):
+        contract_end = parse_date(contract_data.get('until'))
+    elif isinstance(contract_data, str):
+        contract_end = parse_date(contract_data)
+    # Também verifica se há campo direto
+    if not contract_end:
+        contract_end = parse_date(player.get('contractUntil') or player.get('contract_until'))
+    return contract_end
+
+def add_months(day: date, months: int) -> date:
+    """Mesma data N meses depois, no último dia do mês quando o dia não existe (31/01 + 1 -> 28/02)"""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+def contract_end_limit(months) -> Optional[int]:
+    """Data ordinal limite do filtro de expiração de contrato em meses de calendário (None sem filtro)"""
+    if not months:
+        return None
+    try:
+        return add_months(date.today(), int(months)).toordinal()
+    except (ValueError, TypeError, OverflowError) as e:
+        logger.warning("⚠️ Erro no filtro de contrato: %s", e)
+        return None
+
+def date_ordinal(value: Optional[str]) -> Optional[int]:
+    """Data da URL ('2025-06-30' ou '30/06/2025') como ordinal (None se ausente ou inválida)"""
+    parsed = parse_date(value) if value else None
+    return parsed.toordinal() if parsed else None
+
+def resolve_sort_key(sort_by: Optional[str]) -> str:
+    """Chave canônica da ordenação pedida (apelidos aceitos, 'name' se desconhecida)"""
+    sort_key = PLAYER_SORT_ALIASES.get(sort_by, sort_by)
+    return sort_key if sort_key in PLAYER_SORT_KEYS else 'name'
+
+def _player_fields(player: Dict) -> Tuple:
+    """Normaliza um jogador uma única vez na carga: datas como ordinal e valor de mercado numérico"""
+    birth = parse_date(player.get('dateOfBirth'))
+    contract_end = contract_end_date(player)
+    market_value = parse_market_value(player.get('marketValue'))
+    return (
+        _player_id(player),
+        player.get("name"),
+        player.get("position"),
+        player.get("serie"),
+        player.get("club_name"),
+        _as_int(player.get("age")),
+        birth.toordinal() if birth else None,
+        contract_end.toordinal() if contract_end else None,
+        market_value if market_value is not None else -1.0
+    )
+
+def _display_memo(function):
+    """Memo limitado (LRU) de uma formatação de exibição; valores não hasheáveis são formatados direto"""
+    cached = functools.lru_cache(maxsize=DISPLAY_FORMAT_MEMO_SIZE, typed=True)(function)
+
+    @functools.wraps(function)
+    def wrapper(value):
+        if isinstance(value, (dict, list)):
+            return function(value)
+        return cached(value)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+_CURRENCY_SYMBOLS_RE = re.compile(r'[€$£R\s]')
+_CURRENCY_NUMBER_RE = re.compile(r'[\d.]+')
+
+@_display_memo
 def format_currency(value: str) -> str:
     """Formata valor monetário no formato abreviado (7M, 700k, etc.)"""
-    if not value or value == "N/A" or value is None:
+    if not value or value == "N/A":
         return "N/A"
     
     # Garantir que é string
     value_str = str(value).strip()
     
     # Se já está no formato abreviado, retorna como está
-    if any(suffix in value_str.upper() for suffix in ['M', 'K']) and len(value_str) <= 10:
-        return value_str
+    if len(value_str) <= 10:
+        upper = value_str.upper()
+        if 'M' in upper or 'K' in upper:
+            return value_str
     
-    # Extrai valor numérico do texto
+    # Extrai valor numérico do texto: sem símbolos de moeda e espaços, vírgula como ponto decimal
+    numeric_match = _CURRENCY_NUMBER_RE.search(_CURRENCY_SYMBOLS_RE.sub('', value_str).replace(',', '.'))
+    if not numeric_match:
+        return value_str
     try:
-        # Remove símbolos de moeda e espaços
-        clean_value = re.sub(r'[€$£R\s]', '', value_str)
-        
-        # Substitui vírgulas por pontos para números decimais
-        clean_value = clean_value.replace(',', '.')
-        
-        # Extrai apenas números e pontos
-        numeric_match = re.search(r'[\d.]+', clean_value)
-        if not numeric_match:
-            return value_str
-            
         numeric_value = float(numeric_match.group())
-        
-        # Formato abreviado
-        if numeric_value >= 1000000:
-            # Milhões
-            millions = numeric_value / 1000000
-            if millions >= 10:
-                return f"{int(millions)}M"
-            else:
-                return f"{millions:.1f}M".rstrip('0').rstrip('.')
-        elif numeric_value >= 1000:
-            # Milhares
-            thousands = numeric_value / 1000
-            if thousands >= 10:
-                return f"{int(thousands)}k"
-            else:
-                return f"{thousands:.0f}k"
-        else:
-            # Valores menores que 1000
-            return f"{int(numeric_value)}" if numeric_value == int(numeric_value) else f"{numeric_value:.1f}"
-            
-    except (ValueError, TypeError):
-        return value_str if value_str else "N/A"
+    except ValueError:
+        return value_str
     
-    return value_str if value_str else "N/A"
+    # Formato abreviado
+    if numeric_value >= 1000000:
+        # Milhões
+        millions = numeric_value / 1000000
+        if millions >= 10:
+            return f"{int(millions)}M"
+        return f"{millions:.1f}M".rstrip('0').rstrip('.')
+    if numeric_value >= 1000:
+        # Milhares
+        thousands = numeric_value / 1000
+        if thousands >= 10:
+            return f"{int(thousands)}k"
+        return f"{thousands:.0f}k"
+    # Valores menores que 1000
+    return f"{int(numeric_value)}" if numeric_value == int(numeric_value) else f"{numeric_value:.1f}"
+
+@_display_memo
+def format_date(date_str):
+    """Data da API ('2025-06-30' ou '30/06/2025') como dd/mm/aaaa (o valor original se não for data)"""
+    if not date_str:
+        return "N/A"
+    date_obj = parse_date(date_str)
+    if date_obj:
+        return date_obj.strftime("%d/%m/%Y")
+    return date_str
+
+def aggregate_player_stats(stats: Optional[Dict]) -> Optional[Dict]:
+    """Agrupa stats.stats por temporada e competição em uma passada, com totais por temporada e da carreira
+
+    Temporadas em ordem decrescente; dentro de cada uma, registros e competições na ordem da API.
+    None se não há registros.
+    """
+    records = stats.get('stats') if isinstance(stats, dict) else None
+    if not records or not isinstance(records, list):
+        return None
+    seasons = {}
+    competition_ids = set()
+    career = dict.fromkeys(PLAYER_STATS_TOTAL_FIELDS, 0)
+    for record in records:
+        season_id = record.get('seasonId')
+        competition_id = record.get('competitionId')
+        season = seasons.get(season_id)
+        if season is None:
+            season = seasons[season_id] = {'season': season_id, 'stats': [], 'competitions': {},
+                                           'totals': dict.fromkeys(PLAYER_STATS_TOTAL_FIELDS, 0)}
+        competition = season['competitions'].get(competition_id)
+        if competition is None:
+            competition = season['competitions'][competition_id] = {
+                'competitionId': competition_id,
+                'competitionName': record.get('competitionName'),
+                'totals': dict.fromkeys(PLAYER_STATS_TOTAL_FIELDS, 0),
+            }
+        season['stats'].append(record)
+        competition_ids.add(competition_id)
+        for field in PLAYER_STATS_TOTAL_FIELDS:
+            value = _as_int(record.get(field))
+            if value is not None:
+                season['totals'][field] += value
+                competition['totals'][field] += value
+                career[field] += value
+    ordered = sorted(seasons.values(), key=lambda season: str(season['season']).lower(), reverse=True)
+    for season in ordered:
+        season['competitions'] = list(season['competitions'].values())
+    return {'records': len(records), 'competitions': len(competition_ids), 'seasons': ordered, 'totals': career}
+
+def with_stats_summary(stats):
+    """Resposta de estatísticas da API com o agrupamento em 'summary' (outros valores passam direto)"""
+    if not isinstance(stats, dict):
+        return stats
+    return {**stats, 'summary': aggregate_player_stats(stats)}
 
 def calculate_age(birth_date: str) -> Optional[int]:
     """Calcula idade a partir da data de nascimento"""
@@ -290,6 +2420,39 @@ def calculate_age(birth_date: str) -> Optional[int]:
         return today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
     return None
 
+@app.before_request
+def start_request_timer():
+    """Marca o início da requisição (histograma por endpoint)"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_duration(response):
+    """Registra a duração da requisição (streams: até a resposta ser montada)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or "none",
+                                method=request.method, status=response.status_code)
+    return response
+
+def _template_started(sender, template, context, **extra):
+    """Início da renderização (pilha em g: um template pode ser renderizado dentro de outra view)"""
+    g.setdefault('template_timers', []).append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    """Fim da renderização: registra a duração do template"""
+    timers = g.get('template_timers')
+    if timers:
+        SPAN_SECONDS.observe(time.perf_counter() - timers.pop(), span=f"render.{template.name}")
+
+# Renderização de cada template medida como etapa render.<template>
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+@app.context_processor
+def inject_roster_info():
+    """Disponibiliza a idade do snapshot do elenco para os templates"""
+    return {'roster_info': api_client.snapshot_info()}
+
 # Configurações de login simples
 
 
@@ -298,11 +2461,17 @@ def is_logged_in():
     return session.get('logged_in', False)
 
 def require_login(f):
-    """Decorator para rotas que requerem login"""
-    def decorated_function(*args, **kwargs):
-        if not is_logged_in():
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
+    """Decorator para rotas que requerem login (views síncronas ou assíncronas)"""
+    if inspect.iscoroutinefunction(f):
+        async def decorated_function(*args, **kwargs):
+            if not is_logged_in():
+                return redirect(url_for('login'))
+            return await f(*args, **kwargs)
+    else:
+        def decorated_function(*args, **kwargs):
+            if not is_logged_in():
+                return redirect(url_for('login'))
+            return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
     return decorated_function
 
@@ -334,204 +2503,130 @@ def logout():
 @require_login
 def index():
     """Página principal com busca de jogadores"""
-    # Busca parâmetros da URL
-    search_name = request.args.get('search_name', '')
-    serie_filter = request.args.get('serie', '')
-    club_filter = request.args.get('club', '')
-    position_filter = request.args.get('position', '')
-    age_min = request.args.get('age_min', type=int)
-    age_max = request.args.get('age_max', type=int)
-    sort_by = request.args.get('sort_by', 'name')
-    page = request.args.get('page', 1, type=int)
+    # Parâmetros da URL normalizados: definem sozinhos o conteúdo da busca (chave do cache)
+    params = {
+        'search_name': request.args.get('search_name', ''),
+        'serie': request.args.get('serie', ''),
+        'club': request.args.get('club', ''),
+        'position': request.args.get('position', ''),
+        'age_min': request.args.get('age_min', type=int),
+        'age_max': request.args.get('age_max', type=int),
+        'sort_by': request.args.get('sort_by', 'name'),
+        'order': 'desc' if request.args.get('order') == 'desc' else 'asc',
+        'contract_end': request.args.get('contract_end'),
+        'fuzzy': request.args.get('fuzzy') == '1',
+        'page': request.args.get('page', 1, type=int),
+    }
+    
+    # Conteúdo cacheado por filtros + versão do elenco (+ dia, por causa das idades);
+    # navbar, usuário e mensagens ficam no index.html, renderizado a cada requisição
+    store = api_client._get_store()
+    key = (store.version, date.today().toordinal(), tuple(params.items()))
+    rendered = []
+    
+    def build():
+        content, complete = _render_index_content(params)
+        rendered.append(content)
+        return content if complete else None  # Falha na busca não entra no cache
+    
+    content = index_fragment_cache.get(key, build)
+    if content is None:
+        content = rendered[0] if rendered else _render_index_content(params)[0]
+    return render_template('index.html', content=content)
+
+def _render_index_content(params: Dict) -> Tuple[Markup, bool]:
+    """Renderiza filtros, resultados e paginação da busca: (html, busca concluída)"""
+    search_name = params['search_name']
+    serie_filter = params['serie']
+    club_filter = params['club']
+    position_filter = params['position']
+    age_min = params['age_min']
+    age_max = params['age_max']
+    sort_by = params['sort_by']
+    fuzzy = params['fuzzy']
+    page = params['page']
     
     # Busca dados
     series_info = api_client.get_series_info()
     clubs_info = api_client.get_clubs_info()
     
-    # Busca jogadores com sistema local
-    players = []
+    # Filtro por expiração do contrato (em meses): faixa sobre a data ordinal pré-calculada
+    contract_end_filter = params['contract_end']
+    contract_end_max = contract_end_limit(contract_end_filter)
     
-    # Se há qualquer filtro ativo, usa busca avançada local
-    if any([search_name, serie_filter, club_filter, position_filter, age_min, age_max]):
-        players = api_client.search_players(
+    # Busca no armazenamento colunar: bitmap dos filtros (e linhas, se houver busca por nome)
+    complete = True
+    try:
+        # Contagens dos filtros para os demais filtros ativos (popcounts, sem repetir a busca por nome)
+        store, bitmap, rows, facets = api_client.search_rows_and_facets(
             name=search_name.strip() if search_name else None,
             serie=serie_filter if serie_filter else None,
             club=club_filter if club_filter else None,
             position=position_filter if position_filter else None,
             age_min=age_min,
             age_max=age_max,
-            limit=None  # Sem limite para permitir ordenação completa
+            fuzzy=fuzzy,
+            contract_end_max=contract_end_max
         )
-        print(f"✅ Busca com filtros retornou {len(players)} jogadores")
-    else:
-        # Busca padrão - todos os jogadores
-        players = api_client._load_all_players()
-        print(f"✅ Busca padrão retornou {len(players)} jogadores")
-
-    # Processar idades
-    for player in players:
-        player['calculated_age'] = calculate_age(player.get('dateOfBirth'))
-
-    # Filtro por expiração do contrato (em meses)
-    contract_end_filter = request.args.get('contract_end')
-    if contract_end_filter:
-        try:
-            months = int(contract_end_filter)
-            from datetime import datetime, timedelta
-            
-            # Calcula a data limite baseada nos meses selecionados
-            today = datetime.now()
-            limit_date = today + timedelta(days=months * 30)  # Aproximação de 30 dias por mês
-            
-            print(f"📅 Filtro contrato: contratos que expiram em até {months} meses (até {limit_date.strftime('%d/%m/%Y')})")
-            
-            # Debug: verificar alguns contratos
-            contracts_found = 0
-            contracts_samples = []
-            
-            filtered_players = []
-            for player in players:
-                # Verifica diferentes formatos possíveis de contrato
-                contract_data = player.get('contract')
-                contract_end_date = None
-                
-                if isinstance(contract_data, dict):
-                    # Formato: {"until": "data"}
-                    contract_end_date = parse_date(contract_data.get('until'))
-                elif isinstance(contract_data, str):
-                    # Formato: string com data direta
-                    contract_end_date = parse_date(contract_data)
-                
-                # Também verifica se há campo direto
-                if not contract_end_date:
-                    contract_end_date = parse_date(player.get('contractUntil') or player.get('contract_until'))
-                
-                if contract_end_date:
-                    contracts_found += 1
-                    if len(contracts_samples) < 5:
-                        contracts_samples.append(f"{player.get('name', 'N/A')}: {contract_end_date.strftime('%d/%m/%Y')}")
-                    
-                    if contract_end_date <= limit_date:
-                        filtered_players.append(player)
-            
-            print(f"📋 Total de contratos encontrados: {contracts_found}")
-            print(f"📝 Exemplos: {contracts_samples[:3]}")
-            print(f"🎯 Jogadores com contrato expirando em {months} meses: {len(filtered_players)}")
-            
-            players = filtered_players
-            
-        except (ValueError, TypeError) as e:
-            print(f"⚠️ Erro no filtro de contrato: {e}")
-            pass
+    except Exception as e:
+        logger.error("❌ Erro na busca avançada: %s", e)
+        store, bitmap, rows = EMPTY_STORE, 0, None
+        facets = None
+        complete = False
     
-    # Ordenação melhorada (similar ao Flet)
-    def sort_key(player):
-        if sort_by == 'name':
-            return player.get('name', '').lower()
-        elif sort_by == 'age':
-            return player.get('age') or player.get('calculated_age') or 999
-        elif sort_by == 'market_value' or sort_by == 'marketValue':
-            # Extrai valor numérico do market value
-            mv = player.get('marketValue', 0)
-            if isinstance(mv, (int, float)):
-                return mv
-            # Se for string, tenta converter
-            if mv and mv != 'N/A':
-                numeric = re.sub(r'[^\d.,]', '', str(mv).replace(',', '.'))
-                try:
-                    return float(numeric)
-                except:
-                    return 0
-            return 0
-        elif sort_by == 'contract_end' or sort_by == 'contract':
-            contract_date = player.get('contract')
-            if contract_date:
-                try:
-                    return datetime.strptime(contract_date, "%Y-%m-%d")
-                except:
-                    return datetime.max
-            return datetime.max
-        elif sort_by == 'position':
-            return player.get('position', '').lower()
-        elif sort_by == 'club_name' or sort_by == 'club':
-            return player.get('club_name', '').lower()
-        elif sort_by == 'serie':
-            return player.get('serie', '').lower()
-        return player.get('name', '').lower()
-
-    # Aplica ordenação
-    reverse_order = request.args.get('order', 'asc') == 'desc'
-    players.sort(key=sort_key, reverse=reverse_order)
-    
-    # Agrupa jogadores por série primeiro
-    players_by_series = {}
-    for player in players:
-        serie = player.get('serie', 'Outros')
-        if serie not in players_by_series:
-            players_by_series[serie] = []
-        players_by_series[serie].append(player)
+    # Ordenação: permutações pré-calculadas na carga, só as primeiras de cada série são lidas
+    sort_key = resolve_sort_key(sort_by)
+    reverse_order = params['order'] == 'desc'
     
     # Limite de jogadores por série (25) antes da paginação
     max_per_series = 25
+    with span("index.sort"):
+        rows_by_series = dict(store.top_by_serie(sort_key, reverse_order, bitmap, rows, max_per_series))
     
-    # Aplica limite por série e depois faz paginação global
-    limited_players = []
-    for serie in ['Série A', 'Série B', 'Série C', 'Série D']:
-        if serie in players_by_series:
-            serie_players = players_by_series[serie][:max_per_series]
-            limited_players.extend(serie_players)
-    
-    # Adiciona outras séries (se houver)
-    for serie, serie_players in players_by_series.items():
-        if serie not in ['Série A', 'Série B', 'Série C', 'Série D']:
-            limited_players.extend(serie_players[:max_per_series])
-    
-    # Paginação sobre os jogadores limitados
-    per_page = 100  # Aumenta per_page já que limitamos por série
-    total_players = len(limited_players)
-    total_pages = (total_players + per_page - 1) // per_page
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    players_page = limited_players[start_idx:end_idx]
-    
-    # Reagrupa para exibição final
-    players_by_series = {}
-    
-    # Define ordem prioritária das séries principais
-    main_series = ['Série A', 'Série B', 'Série C', 'Série D']
-    
-    # Inicializa séries principais (mesmo que vazias)
-    for serie in main_series:
-        players_by_series[serie] = []
-    
-    # Agrupa jogadores por série
-    for player in players_page:
-        serie = player.get('serie', 'Outras Séries')
-        
-        # Normaliza nome da série
-        if 'série a' in serie.lower() or serie.lower() == 'a':
-            serie = 'Série A'
-        elif 'série b' in serie.lower() or serie.lower() == 'b':
-            serie = 'Série B'
-        elif 'série c' in serie.lower() or serie.lower() == 'c':
-            serie = 'Série C'
-        elif 'série d' in serie.lower() or serie.lower() == 'd':
-            serie = 'Série D'
-        
-        if serie not in players_by_series:
-            players_by_series[serie] = []
-        players_by_series[serie].append(player)
-    
-    # Remove séries vazias (exceto as principais)
-    players_by_series = {
-        serie: players for serie, players in players_by_series.items() 
-        if len(players) > 0 or serie in main_series
-    }
+    # Agrupamento por série e paginação (medidos juntos)
+    with span("index.group"):
+        # Aplica limite por série e depois faz paginação global
+        main_series = ['Série A', 'Série B', 'Série C', 'Série D']
+        limited_rows = []
+        for serie in main_series:
+            if serie in rows_by_series:
+                limited_rows.extend(rows_by_series[serie])
+        
+        # Adiciona outras séries (se houver)
+        for serie, serie_rows in rows_by_series.items():
+            if serie not in main_series:
+                limited_rows.extend(serie_rows)
+        
+        # Paginação sobre os jogadores limitados
+        per_page = 100  # Aumenta per_page já que limitamos por série
+        total_players = len(limited_rows)
+        total_pages = (total_players + per_page - 1) // per_page
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        page_rows = limited_rows[start_idx:end_idx]
+        
+        # Reagrupa para exibição final (séries principais primeiro, mesmo que vazias)
+        players_by_series = {serie: [] for serie in main_series}
+        
+        # Só os jogadores da página viram dicionários de exibição
+        for row in page_rows:
+            players_by_series.setdefault(store.serie_label(row), []).append(store.display_record(row))
+        
+        # Remove séries vazias (exceto as principais)
+        players_by_series = {
+            serie: players for serie, players in players_by_series.items() 
+            if len(players) > 0 or serie in main_series
+        }
     
-    return render_template('index.html',
+    # Links da paginação montados só com os filtros preenchidos
+    query = urlencode([(name, '1' if value is True else value) for name, value in params.items()
+                       if name != 'page' and value not in ('', None, False)])
+    
+    content = render_template('index_content.html',
                          players_by_series=players_by_series,
                          series_info=series_info,
                          clubs_info=clubs_info,
+                         facets=facets,
                          search_params={
                              'search_name': search_name,
                              'serie': serie_filter,
@@ -540,48 +2635,435 @@ def index():
                              'age_min': age_min,
                              'age_max': age_max,
                              'sort_by': sort_by,
+                             'order': params['order'],
+                             'fuzzy': fuzzy,
                              'contract_end': contract_end_filter
                          },
                          pagination={
                              'page': page,
                              'total_pages': total_pages,
                              'total_players': total_players,
-                             'per_page': per_page
+                             'per_page': per_page,
+                             'query': query + '&' if query else ''
                          })
+    return Markup(content), complete
 
 @app.route('/player/<player_id>')
 @require_login
 def player_profile(player_id):
     """Página de perfil do jogador"""
-    # Busca perfil e estatísticas
-    profile = api_client.get_player_profile(player_id)
-    stats = api_client.get_player_stats(player_id)
-    
+    # Busca perfil e estatísticas em paralelo (com cache por jogador)
+    profile, stats = api_client.get_player_details(player_id)
+    return render_player_profile(profile, stats)
+
+def render_player_profile(profile: Optional[Dict], stats: Optional[Dict]):
+    """Renderiza o perfil do jogador (compartilhado com a view assíncrona do asgi.py)"""
     if not profile:
         return render_template('error.html', message="Jogador não encontrado"), 404
     
-    # Adiciona idade calculada
-    profile['calculated_age'] = calculate_age(profile.get('dateOfBirth'))
+    # Adiciona idade calculada (em uma cópia: o perfil fica compartilhado no cache)
+    profile = {**profile, 'calculated_age': calculate_age(profile.get('dateOfBirth'))}
     
     return render_template('player_profile.html', 
                          profile=profile, 
                          stats=stats)
 
+def compare_request_ids() -> List[str]:
+    """Ids de ?ids= (separados por vírgula) sem repetições, na ordem pedida; ValueError se vazio ou acima do limite"""
+    player_ids = list(dict.fromkeys(player_id.strip() for player_id in request.args.get('ids', '').split(',')
+                                    if player_id.strip()))
+    if not player_ids:
+        raise ValueError("Informe os jogadores a comparar em ids= (separados por vírgula)")
+    if len(player_ids) > PLAYERS_COMPARE_MAX:
+        raise ValueError(f"Compare no máximo {PLAYERS_COMPARE_MAX} jogadores por vez")
+    return player_ids
+
+def build_comparison(player_ids: Sequence[str],
+                     details: Sequence[Tuple[Optional[Dict], Optional[Dict]]]) -> Dict:
+    """Comparação lado a lado: um jogador por coluna e as temporadas de todos alinhadas
+
+    Cada temporada (mais recente primeiro) traz os totais de cada jogador na ordem das colunas,
+    None quando ele não tem registros nela. Ids sem perfil ficam em 'missing'.
+    """
+    players, missing, seasons_by_player = [], [], []
+    for player_id, (profile, stats) in zip(player_ids, details):
+        if not profile:
+            missing.append(player_id)
+            continue
+        summary = stats.get('summary') if isinstance(stats, dict) else None
+        players.append({
+            'id': player_id,
+            'profile': {**profile, 'calculated_age': calculate_age(profile.get('dateOfBirth'))},
+            'career': summary['totals'] if summary else None,
+            'competitions': summary['competitions'] if summary else 0,
+        })
+        seasons_by_player.append({season['season']: season['totals'] for season in summary['seasons']}
+                                 if summary else {})
+    seasons = sorted({season for by_season in seasons_by_player for season in by_season},
+                     key=lambda season: str(season).lower(), reverse=True)
+    return {
+        'players': players,
+        'seasons': [{'season': season, 'totals': [by_season.get(season) for by_season in seasons_by_player]}
+                    for season in seasons],
+        'missing': missing,
+    }
+
+def render_comparison(player_ids: Sequence[str], details: Sequence[Tuple[Optional[Dict], Optional[Dict]]]):
+    """Renderiza a comparação (compartilhado com a view assíncrona do asgi.py)"""
+    return render_template('compare.html', comparison=build_comparison(player_ids, details),
+                           player_ids=player_ids)
+
+@app.route('/compare')
+@require_login
+def compare_players():
+    """Comparação lado a lado de até PLAYERS_COMPARE_MAX jogadores (?ids=1,2,3)"""
+    try:
+        player_ids = compare_request_ids()
+    except ValueError as e:
+        return render_template('error.html', message=str(e)), 400
+    # Perfis e estatísticas de todos em um único lote paralelo (com cache por jogador)
+    return render_comparison(player_ids, api_client.get_players_details(player_ids))
+
+@app.route('/api/players/compare')
+@require_login
+def api_players_compare():
+    """Comparação em JSON: perfis, totais da carreira e temporadas alinhadas (?ids=1,2,3)"""
+    try:
+        player_ids = compare_request_ids()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(build_comparison(player_ids, api_client.get_players_details(player_ids)))
+
 @app.route('/api/clubs/<serie>')
 def api_clubs_by_serie(serie):
-    """API endpoint para buscar clubes por série (para AJAX)"""
-    clubs = api_client.get_clubs_info(serie=serie)
-    return jsonify([club['name'] for club in clubs])
+    """API endpoint para buscar clubes por série (para AJAX), revalidável por ETag/Last-Modified"""
+    try:
+        body, etag, modified_at = api_client.get_club_names_json(serie)
+    except Exception as e:
+        logger.error("Erro ao buscar clubes: %s", e)
+        return jsonify([])
+    
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = modified_at
+    response.cache_control.public = True
+    response.cache_control.max_age = PLAYERS_AGGREGATES_MAX_AGE
+    # Responde 304 quando If-None-Match/If-Modified-Since ainda valem
+    return response.make_conditional(request)
+
+def requested_fields() -> List[str]:
+    """Campos pedidos em ?fields= (separados por vírgula; lista vazia se ausente)"""
+    return [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+
+def search_request_filters() -> Dict:
+    """Filtros da requisição (os da página principal e as faixas da API) como parâmetros de search_rows"""
+    # Fim de contrato: janela em meses e/ou datas explícitas (vale o limite mais restritivo)
+    contract_end_max = [limit for limit in (contract_end_limit(request.args.get('contract_end')),
+                                            date_ordinal(request.args.get('contract_end_to')))
+                        if limit is not None]
+    return {
+        'name': request.args.get('search_name') or None,
+        'serie': request.args.get('serie') or None,
+        'club': request.args.get('club') or None,
+        'position': request.args.get('position') or None,
+        'age_min': request.args.get('age_min', type=int),
+        'age_max': request.args.get('age_max', type=int),
+        'fuzzy': request.args.get('fuzzy') == '1',
+        'contract_end_max': min(contract_end_max) if contract_end_max else None,
+        'contract_end_min': date_ordinal(request.args.get('contract_end_from')),
+        'birth_min': date_ordinal(request.args.get('birth_from')),
+        'birth_max': date_ordinal(request.args.get('birth_to')),
+        'market_value_min': parse_market_value(request.args.get('market_value_min')),
+        'market_value_max': parse_market_value(request.args.get('market_value_max')),
+    }
+
+def search_request_bitmap(filters: Optional[Dict] = None) -> Tuple[PlayerStore, int]:
+    """Aplica os filtros da requisição (ou os já lidos dela): (armazenamento, bitmap do resultado)"""
+    store, bitmap, rows = api_client.search_rows(**(filters if filters is not None else search_request_filters()))
+    if rows is not None:
+        # Busca por nome: as linhas encontradas viram bitmap e seguem a mesma ordenação
+        bitmap = _rows_to_bitmap(rows, store.size)
+    return store, bitmap
+
+def search_query_key(filters: Dict, sort_by: str, reverse: bool) -> str:
+    """Resumo dos filtros já normalizados, da ordenação e do sentido (o cursor só vale para a mesma busca)"""
+    query = json.dumps([filters, sort_by, reverse], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]
+
+def encode_search_cursor(version: int, position: int, player_id: Optional[str], query: str) -> str:
+    """Cursor opaco: versão do elenco, próxima posição da permutação, id do último jogador entregue e busca"""
+    state = json.dumps({'v': version, 'p': position, 'id': player_id, 'q': query}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_search_cursor(cursor: str, store: PlayerStore, sort_by: str, reverse: bool,
+                         query: str) -> Optional[int]:
+    """Posição onde a busca continua (None se o último jogador entregue saiu do elenco)
+
+    Na mesma versão do elenco a posição do cursor vale direto; depois de uma atualização a busca
+    continua logo após o último jogador entregue na nova permutação. Cursor inválido, com posição
+    negativa ou de outra busca (filtros, ordenação ou sentido diferentes): ValueError.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        version, position, player_id = int(state['v']), int(state['p']), state['id']
+        cursor_query = state['q']
+    except Exception:
+        raise ValueError("cursor inválido")
+    if position < 0:
+        raise ValueError("cursor inválido")
+    if cursor_query != query:
+        raise ValueError("cursor de outra busca: use os mesmos filtros, sort_by e order")
+    if version == store.version:
+        return position
+    previous = store.position_of(sort_by, reverse, player_id) if player_id is not None else None
+    return previous + 1 if previous is not None else None
+
+@app.route('/api/players/search')
+@require_login
+def api_players_search():
+    """Busca de jogadores em JSON com os filtros da página principal, cursor e projeção de campos
+
+    Parâmetros: search_name, serie, club, position, age_min, age_max, contract_end, fuzzy,
+    faixas contract_end_from/contract_end_to, birth_from/birth_to (datas) e
+    market_value_min/market_value_max ('1.5m', '700k'), sort_by, order, fields (separados por
+    vírgula), limit e cursor. Com format=ndjson (ou
+    Accept: application/x-ndjson) todo o resultado é enviado em stream, um jogador por linha.
+    """
+    fields = requested_fields()
+    unknown = [field for field in fields if field not in PLAYER_API_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Campos desconhecidos: {', '.join(unknown)}",
+                        'fields': list(PLAYER_API_FIELDS)}), 400
+    
+    stream = (request.args.get('format') == 'ndjson' or
+              request.accept_mimetypes.best == 'application/x-ndjson')
+    limit = request.args.get('limit', None if stream else PLAYERS_SEARCH_PAGE_SIZE, type=int)
+    if limit is not None:
+        # O stream não tem teto de página, mas um limite negativo vira "nenhum jogador"
+        limit = max(0, limit) if stream else max(1, min(limit, PLAYERS_SEARCH_MAX_PAGE_SIZE))
+    sort_key = resolve_sort_key(request.args.get('sort_by', 'name'))
+    reverse_order = request.args.get('order') == 'desc'
+    
+    filters = search_request_filters()
+    query = search_query_key(filters, sort_key, reverse_order)
+    try:
+        store, bitmap = search_request_bitmap(filters)
+    except Exception as e:
+        logger.error("❌ Erro na busca da API: %s", e)
+        return jsonify({'error': "Busca indisponível"}), 503
+    
+    start = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            start = decode_search_cursor(cursor, store, sort_key, reverse_order, query)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if start is None:
+            return jsonify({'error': "Cursor expirado: o elenco mudou, refaça a busca"}), 410
+    
+    project = store.projector(fields or PLAYER_API_DEFAULT_FIELDS)
+    matches = store.ordered(sort_key, reverse_order, bitmap, start)
+    if limit is not None:
+        matches = itertools.islice(matches, limit)
+    
+    if stream:
+        def generate():
+            # Um jogador por linha, sem montar a resposta inteira em memória
+            for _, row in matches:
+                yield json.dumps(project(row), ensure_ascii=False) + '\n'
+        return app.response_class(generate(), mimetype='application/x-ndjson')
+    
+    players, last = [], None
+    for position, row in matches:
+        players.append(project(row))
+        last = (position, row)
+    next_cursor = None
+    if last is not None and len(players) == limit:
+        # Só devolve cursor se ainda há jogadores depois da página
+        position, row = last
+        if next(store.ordered(sort_key, reverse_order, bitmap, position + 1), None) is not None:
+            next_cursor = encode_search_cursor(store.version, position + 1, store.ids[row], query)
+    return jsonify({
+        'players': players,
+        'total': _popcount(bitmap),
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/players/<player_id>/similar')
+@require_login
+def api_players_similar(player_id):
+    """Jogadores parecidos: mesma posição, idade, valor de mercado, tempo de contrato e série próximos
+
+    Aceita os filtros de /api/players/search para restringir os candidatos (ex.: contract_end=6
+    para contratos que terminam em até 6 meses), fields e limit (padrão 10, máximo 100). Cada
+    jogador vem com a distância ao de referência (menor = mais parecido).
+    """
+    fields = requested_fields()
+    unknown = [field for field in fields if field not in PLAYER_API_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Campos desconhecidos: {', '.join(unknown)}",
+                        'fields': list(PLAYER_API_FIELDS)}), 400
+    limit = request.args.get('limit', PLAYERS_SIMILAR_LIMIT, type=int)
+    limit = max(1, min(limit, PLAYERS_SIMILAR_MAX_LIMIT))
+    
+    try:
+        store, row, matches = api_client.similar_players(player_id, limit, **search_request_filters())
+    except Exception as e:
+        logger.error("❌ Erro na busca de parecidos: %s", e)
+        return jsonify({'error': "Busca indisponível"}), 503
+    if row is None:
+        return jsonify({'error': "Jogador não encontrado"}), 404
+    
+    project = store.projector(fields or PLAYER_API_DEFAULT_FIELDS)
+    return jsonify({
+        'player': project(row),
+        'similar': [{**project(other), 'distance': round(distance, 4)} for other, distance in matches]
+    })
+
+def export_value(value, excel: bool = False):
+    """Valor de uma célula do CSV (no modo Excel, vírgula decimal); texto que seria fórmula é protegido"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        value = int(value) if value.is_integer() else value
+        return str(value).replace('.', ',') if excel else value
+    # Qualquer CSV pode acabar aberto numa planilha, não só o do modo Excel
+    if isinstance(value, str) and value[:1] in PLAYERS_EXPORT_FORMULA_PREFIXES:
+        return "'" + value
+    return value
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterable[bytes]:
+    """Comprime em gzip um stream de blocos sem juntar o conteúdo"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/players/facets')
+@require_login
+def api_players_facets():
+    """Contagens por série, clube, posição, faixa de idade e expiração de contrato para os filtros atuais
+
+    Aceita os mesmos filtros de /api/players/search; a contagem de cada faceta ignora o próprio
+    filtro (ex.: com serie=Série B, 'serie' traz quantos jogadores cada série teria).
+    """
+    try:
+        facets = api_client.search_facets(**search_request_filters())
+    except Exception as e:
+        logger.error("❌ Erro nas facetas: %s", e)
+        return jsonify({'error': "Busca indisponível"}), 503
+    return jsonify(facets)
+
+@app.route('/export/players')
+@require_login
+def export_players():
+    """Exporta a lista filtrada completa (sem o limite por série/página) em CSV, em stream
+
+    Aceita os filtros e a ordenação da página principal e fields=. Com format=excel o arquivo sai
+    no formato que o Excel em português abre direto (BOM UTF-8, ';' e vírgula decimal); nos dois modos,
+    texto iniciado por =, +, -, @, tab ou \\r ganha um apóstrofo na frente (injeção de fórmulas). Com
+    Accept-Encoding: gzip a saída é comprimida durante o envio.
+    """
+    fields = requested_fields() or list(PLAYERS_EXPORT_FIELDS)
+    unknown = [field for field in fields if field not in PLAYER_API_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Campos desconhecidos: {', '.join(unknown)}",
+                        'fields': list(PLAYER_API_FIELDS)}), 400
+    excel = request.args.get('format') == 'excel'
+    sort_key = resolve_sort_key(request.args.get('sort_by', 'name'))
+    reverse_order = request.args.get('order') == 'desc'
+    
+    try:
+        store, bitmap = search_request_bitmap()
+    except Exception as e:
+        logger.error("❌ Erro na exportação: %s", e)
+        return jsonify({'error': "Busca indisponível"}), 503
+    project = store.projector(fields)
+    matches = store.ordered(sort_key, reverse_order, bitmap)
+    
+    def generate():
+        # Memória constante: cada bloco de jogadores é escrito, enviado e descartado
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';' if excel else ',')
+        if excel:
+            buffer.write('\ufeff')
+        writer.writerow(fields)
+        while True:
+            chunk = list(itertools.islice(matches, PLAYERS_EXPORT_CHUNK_SIZE))
+            for _, row in chunk:
+                record = project(row)
+                writer.writerow([export_value(record[field], excel) for field in fields])
+            yield buffer.getvalue().encode('utf-8')
+            if not chunk:
+                return
+            buffer.seek(0)
+            buffer.truncate()
+    
+    body = generate()
+    compress = request.accept_encodings['gzip'] > 0
+    if compress:
+        body = gzip_stream(body)
+    response = app.response_class(body, mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="jogadores_{date.today():%Y%m%d}.csv"'
+    response.vary.add('Accept-Encoding')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def _cache_counters():
+    """Contadores acumulados dos caches em memória: (cache, resultado) -> total"""
+    for cache, stats in (('player_details', api_client.details_cache_stats()),
+                         ('index_fragments', index_fragment_cache.stats())):
+        for result in ('hits', 'negative_hits', 'misses', 'coalesced'):
+            yield (cache, result), stats[result]
+
+def _cache_gauges(field: str):
+    """Campo das estatísticas de cada cache: (cache,) -> valor"""
+    for cache, stats in (('player_details', api_client.details_cache_stats()),
+                         ('index_fragments', index_fragment_cache.stats())):
+        yield (cache,), stats[field]
+
+def _roster_gauge(field: str):
+    """Campo do estado do snapshot do elenco (nada antes da primeira carga)"""
+    info = api_client.snapshot_info()
+    if info is not None and info.get(field) is not None:
+        yield (), info[field]
+
+_Collected("players_cache_requests_total", "Consultas aos caches em memória por resultado", "counter",
+           ("cache", "result"), _cache_counters)
+_Collected("players_cache_evictions_total", "Entradas removidas pelo limite do cache", "counter",
+           ("cache",), lambda: _cache_gauges('evictions'))
+_Collected("players_cache_entries", "Entradas nos caches em memória", "gauge", ("cache",),
+           lambda: _cache_gauges('size'))
+_Collected("players_roster_players", "Jogadores no elenco em memória", "gauge", (),
+           lambda: _roster_gauge('players'))
+_Collected("players_roster_age_seconds", "Idade dos dados do elenco", "gauge", (),
+           lambda: _roster_gauge('age'))
+_Collected("players_roster_generation", "Geração do snapshot do elenco", "gauge", (),
+           lambda: _roster_gauge('generation'))
+
+@app.route('/metrics')
+def metrics():
+    """Métricas do processo no formato de texto do Prometheus (cada worker expõe as suas)"""
+    return app.response_class(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Estado dos caches: snapshot do elenco, perfil/estatísticas e fragmentos da página principal"""
+    return jsonify({
+        'roster': api_client.snapshot_info(),
+        'player_details': api_client.details_cache_stats(),
+        'index_fragments': index_fragment_cache.stats()
+    })
 
 @app.template_filter('format_date')
-def format_date(date_str):
+def format_date_filter(date_str):
     """Filtro para formatação de datas"""
-    if not date_str:
-        return "N/A"
-    date_obj = parse_date(date_str)
-    if date_obj:
-        return date_obj.strftime("%d/%m/%Y")
-    return date_str
+    return format_date(date_str)
 
 @app.template_filter('format_currency')
 def format_currency_filter(value):
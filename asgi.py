@@ -0,0 +1,237 @@
+"""
+Entrada ASGI do Brasileirão Players Search
+Modo assíncrono: as páginas que dependem da API rodam no loop de eventos e o resto segue no Flask
+
+Uso:
+    uvicorn asgi:application --host 0.0.0.0 --port 5001
+
+As views de `/`, `/player/<player_id>`, `/compare`, `/api/players/compare` e `/api/clubs/<serie>`
+são atendidas aqui sem ocupar uma thread por requisição: perfil e estatísticas vêm de um cliente
+aiohttp com pool de conexões e o mesmo cache por jogador do APIClient. Demais rotas (login,
+estáticos) passam pelo app WSGI via asgiref.
+"""
+from asgiref.wsgi import WsgiToAsgi
+from typing import Dict, List, Optional, Sequence, Tuple
+from werkzeug.exceptions import HTTPException
+import asyncio
+import io
+import os
+import sys
+
+import aiohttp
+
+from flask import jsonify, render_template
+
+from app import (app, api_client, APIClient, PlayerStore, _LRUCache, UPSTREAM_REQUESTS,
+                 logger, span, require_login, render_player_profile, with_stats_summary,
+                 compare_request_ids, build_comparison, render_comparison)
+
+# Conexões simultâneas com a API (perfil/estatísticas) por processo
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("ASYNC_MAX_CONNECTIONS", 200))
+
+class AsyncAPIClient:
+    """Contraparte assíncrona do APIClient: mesmo elenco, mesmo cache de perfil/estatísticas"""
+
+    def __init__(self, client: APIClient, max_connections: int = ASYNC_MAX_CONNECTIONS):
+        self.client = client  # Elenco em memória, snapshot e cache por jogador compartilhados
+        self.base_url = client.base_url
+        self.max_connections = max_connections
+        self._http = None  # Criado no loop que atende as requisições
+
+    @property
+    def _session(self) -> aiohttp.ClientSession:
+        if self._http is None:
+            self._http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+        return self._http
+
+    async def aclose(self):
+        """Fecha o pool de conexões"""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def get_store(self) -> PlayerStore:
+        """Elenco atual; a primeira carga (bloqueante) roda fora do loop"""
+        if self.client._store is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.client._get_store)
+        return self.client._get_store()
+
+    async def _fetch_player_resource(self, player_id: str, resource: str, timeout: float):
+        """GET de /players/<id>/<resource>: JSON, NOT_FOUND (404) ou None em caso de erro"""
+        # O tempo de espera por uma conexão livre do pool não conta no timeout da API
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        try:
+            with span(f"upstream.{resource}"):
+                async with self._session.get(f"{self.base_url}/players/{player_id}/{resource}",
+                                             timeout=timeout) as response:
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        UPSTREAM_REQUESTS.inc(resource=resource, outcome="ok")
+                        return data
+                    status = response.status
+            if status == 404:
+                UPSTREAM_REQUESTS.inc(resource=resource, outcome="not_found")
+                return _LRUCache.NOT_FOUND
+            logger.warning("Erro ao buscar %s do jogador %s: HTTP %d", resource, player_id, status)
+        except Exception as e:
+            logger.warning("Erro ao buscar %s do jogador %s: %r", resource, player_id, e)
+        UPSTREAM_REQUESTS.inc(resource=resource, outcome="error")
+        return None
+
+    async def get_player_profile(self, player_id: str) -> Optional[Dict]:
+        """Busca perfil de um jogador específico (cache por jogador)"""
+        return await self.client._details_cache.aget(
+            ("profile", player_id), lambda: self._fetch_player_resource(player_id, "profile", 10))
+
+    async def _fetch_player_stats(self, player_id: str):
+        """Estatísticas da API já agrupadas por temporada (mesmo formato guardado pelo APIClient)"""
+        return with_stats_summary(await self._fetch_player_resource(player_id, "stats", 15))
+
+    async def get_player_stats(self, player_id: str) -> Optional[Dict]:
+        """Busca estatísticas de um jogador, já agrupadas por temporada (cache por jogador)"""
+        return await self.client._details_cache.aget(("stats", player_id), lambda: self._fetch_player_stats(player_id))
+
+    async def get_player_details(self, player_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Perfil e estatísticas buscados em paralelo: (perfil, estatísticas)"""
+        profile, stats = await asyncio.gather(self.get_player_profile(player_id),
+                                              self.get_player_stats(player_id))
+        return profile, stats
+
+    async def get_players_details(self, player_ids: Sequence[str]) -> List[Tuple[Optional[Dict], Optional[Dict]]]:
+        """Perfil e estatísticas de vários jogadores de uma vez (limitado pelo pool de conexões)"""
+        return list(await asyncio.gather(*(self.get_player_details(player_id) for player_id in player_ids)))
+
+async_api_client = AsyncAPIClient(api_client)
+
+@require_login
+async def index():
+    """Página principal: a busca é só CPU sobre o elenco em memória, então reaproveita a view do app"""
+    await async_api_client.get_store()
+    return app.view_functions['index']()
+
+@require_login
+async def player_profile(player_id):
+    """Página de perfil do jogador sem bloquear o loop durante as chamadas à API"""
+    profile, stats = await async_api_client.get_player_details(player_id)
+    return render_player_profile(profile, stats)
+
+@require_login
+async def compare_players():
+    """Comparação lado a lado: todos os perfis e estatísticas buscados juntos no loop"""
+    try:
+        player_ids = compare_request_ids()
+    except ValueError as e:
+        return render_template('error.html', message=str(e)), 400
+    return render_comparison(player_ids, await async_api_client.get_players_details(player_ids))
+
+@require_login
+async def api_players_compare():
+    """Comparação em JSON (mesma resposta da view do app)"""
+    try:
+        player_ids = compare_request_ids()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(build_comparison(player_ids, await async_api_client.get_players_details(player_ids)))
+
+async def api_clubs_by_serie(serie):
+    """Lista de clubes da série (mesma resposta condicional da view do app)"""
+    await async_api_client.get_store()
+    return app.view_functions['api_clubs_by_serie'](serie)
+
+# Endpoints do app atendidos no loop assíncrono (os demais seguem pelo WSGI)
+ASYNC_VIEWS = {
+    'index': index,
+    'player_profile': player_profile,
+    'api_clubs_by_serie': api_clubs_by_serie,
+    'compare_players': compare_players,
+    'api_players_compare': api_players_compare,
+}
+
+_wsgi_application = WsgiToAsgi(app)
+
+def _build_environ(scope: Dict) -> Dict:
+    """Environ WSGI (PEP 3333) de uma requisição ASGI sem corpo (GET/HEAD)"""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+async def _dispatch(environ: Dict, view, view_args: Dict):
+    """Executa a view assíncrona no contexto de requisição do Flask (sessão, url_for, templates)"""
+    with app.request_context(environ):
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view(**view_args)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            return app.handle_exception(e)
+
+async def _lifespan(receive, send):
+    """Fecha o pool do cliente assíncrono quando o servidor encerra"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_api_client.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    """Aplicação ASGI: views assíncronas para as rotas da API, Flask (WSGI) para o resto"""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+        return await _wsgi_application(scope, receive, send)
+
+    environ = _build_environ(scope)
+    try:
+        endpoint, view_args = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        endpoint = None
+    view = ASYNC_VIEWS.get(endpoint)
+    if view is None:
+        return await _wsgi_application(scope, receive, send)
+
+    response = await _dispatch(environ, view, view_args)
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in response.headers.items()],
+    })
+    try:
+        if scope["method"] != "HEAD":
+            for chunk in response.iter_encoded():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        response.close()
@@ -0,0 +1,252 @@
+"""
+Benchmarks do Brasileirão Players Search
+Elenco sintético determinístico servido pela API local (mock_api) com latência configurável
+
+Uso:
+    python benchmarks/run.py --players 20000 --output benchmarks/results/base.json
+    python benchmarks/run.py --players 100000 --latency 0.05 --only search,index
+    python benchmarks/run.py --players 20000 --compare benchmarks/results/base.json
+
+Cada benchmark é repetido --repeat vezes (após um aquecimento) e o resultado em JSON traz
+mínimo, mediana, média e p95 em milissegundos, para comparar execuções entre mudanças.
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Antes de importar o app: sem snapshot em disco (cada carga vem da API) e sem logs por busca
+os.environ["PLAYERS_SNAPSHOT_DIR"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from werkzeug.serving import make_server
+
+import app as players_app
+import mock_api
+
+# Log de acesso do servidor da API local atrapalharia a saída (e o tempo) das medições
+logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+def measure(function: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None,
+            warmup: int = 1) -> Dict:
+    """Tempo de cada execução (setup fora da medição): mínimo, mediana, média e p95 em ms"""
+    timings = []
+    for run in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - started) * 1000
+        if run >= warmup:
+            timings.append(elapsed)
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+class MockServer:
+    """API local (mock_api) em uma thread, numa porta livre"""
+
+    def __init__(self, players: int, seed: int, latency: float, jitter: float):
+        mock_api.load_players(players, seed)
+        mock_api.app.config.update(MOCK_LATENCY=latency, MOCK_LATENCY_JITTER=jitter)
+        self._server = make_server("127.0.0.1", 0, mock_api.app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'MockServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+
+def benchmark_load(base_url: str, repeat: int) -> Dict[str, Dict]:
+    """Carga do elenco pela API: completa (cliente novo) e revalidação sem mudanças (304 por página)"""
+    results = {}
+    results["load.full"] = measure(lambda: players_app.APIClient(base_url)._load_all_players(),
+                                   max(1, repeat // 2))
+    client = players_app.APIClient(base_url)
+    client._load_all_players()
+    results["load.revalidate"] = measure(client._refresh_from_api, repeat)
+    return results
+
+def benchmark_store(players: List[Dict], repeat: int) -> Dict[str, Dict]:
+    """Montagem do armazenamento colunar e das permutações de ordenação"""
+    results = {"store.build": measure(lambda: players_app.PlayerStore.from_players(players), max(1, repeat // 2))}
+    stores = []
+    results["store.prepare_orders"] = measure(
+        lambda: stores[-1].prepare_orders(), max(1, repeat // 2),
+        setup=lambda: stores.append(players_app.PlayerStore.from_players(players)))
+    return results
+
+SEARCH_CASES = {
+    "search.all": {},
+    "search.serie": {"serie": "Série B"},
+    "search.club": {"club": "Clube A07"},
+    "search.position_age": {"position": "Centre-Back", "age_min": 20, "age_max": 25},
+    "search.name": {"name": "silva"},
+    "search.name_fuzzy": {"name": "everton sousa", "fuzzy": True},
+}
+
+def benchmark_search(client: 'players_app.APIClient', repeat: int) -> Dict[str, Dict]:
+    """search_players_local com os filtros mais comuns da página principal e jogadores parecidos"""
+    results = {name: measure(lambda filters=filters: client.search_players_local(**filters), repeat)
+               for name, filters in SEARCH_CASES.items()}
+    results["search.similar"] = measure(lambda: client.similar_players("1", 10), repeat)
+    results["search.similar_filtered"] = measure(
+        lambda: client.similar_players("1", 10, position="Centre-Back", contract_end_max=players_app.contract_end_limit(12)),
+        repeat)
+    return results
+
+INDEX_CASES = {
+    "index.default": "/",
+    "index.serie_sorted": "/?serie=S%C3%A9rie+B&sort_by=marketValue&order=desc",
+    "index.contract": "/?contract_end=12&sort_by=contract",
+    "index.name": "/?search_name=silva&sort_by=age",
+}
+
+def benchmark_index(test_client, repeat: int) -> Dict[str, Dict]:
+    """index() de ponta a ponta (cliente de teste): sem e com o fragmento em cache"""
+    results = {}
+    for name, url in INDEX_CASES.items():
+        results[f"{name}.cold"] = measure(lambda url=url: test_client.get(url), repeat,
+                                          setup=players_app.index_fragment_cache.clear)
+        results[f"{name}.warm"] = measure(lambda url=url: test_client.get(url), repeat)
+    return results
+
+def benchmark_render(test_client, repeat: int) -> Dict[str, Dict]:
+    """Só a renderização do conteúdo da página principal (100 cartões), total e por cartão"""
+    captured = {}
+
+    def capture(sender, template, context, **extra):
+        if template.name == 'index_content.html':
+            captured.update(context)
+
+    players_app.index_fragment_cache.clear()
+    with players_app.template_rendered.connected_to(capture, players_app.app):
+        test_client.get("/")
+    context = {name: value for name, value in captured.items() if name not in ("request", "session", "g")}
+    cards = sum(len(players) for players in context["players_by_series"].values())
+    with players_app.app.test_request_context("/"):
+        result = measure(lambda: players_app.render_template('index_content.html', **context), repeat)
+    per_card = {name: round(value / cards, 4) if name.endswith("_ms") else value for name, value in result.items()}
+    return {"render.index_content": result, "render.card": per_card}
+
+def benchmark_profile(test_client, player_ids: List[str], repeat: int) -> Dict[str, Dict]:
+    """player_profile e /compare (20 jogadores) de ponta a ponta: da API (frio) e do cache (quente)"""
+    details_cache = players_app.api_client._details_cache
+    ids = iter(player_ids * (repeat + 2))
+    compare_url = "/compare?ids=" + ",".join(player_ids[:players_app.PLAYERS_COMPARE_MAX])
+    return {
+        "profile.cold": measure(lambda: test_client.get(f"/player/{next(ids)}"), repeat,
+                                setup=details_cache.clear),
+        "profile.warm": measure(lambda: test_client.get(f"/player/{player_ids[0]}"), repeat),
+        "compare.cold": measure(lambda: test_client.get(compare_url), repeat, setup=details_cache.clear),
+        "compare.warm": measure(lambda: test_client.get(compare_url), repeat),
+    }
+
+def git_revision() -> Optional[str]:
+    """Commit atual do repositório (None fora de um checkout git)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args) -> Dict:
+    """Executa os grupos selecionados e devolve o relatório"""
+    only = set(args.only.split(",")) if args.only else None
+    selected = lambda group: only is None or group in only
+    results = {}
+
+    with MockServer(args.players, args.seed, args.latency, args.jitter) as server:
+        if selected("load"):
+            results.update(benchmark_load(server.base_url, args.repeat))
+
+        players = mock_api.generate_players(args.players, args.seed)
+        if selected("store"):
+            results.update(benchmark_store(players, args.repeat))
+
+        client = players_app.api_client
+        client.base_url = server.base_url
+        client._load_all_players()
+        if selected("search"):
+            results.update(benchmark_search(client, args.repeat))
+
+        test_client = players_app.app.test_client()
+        with test_client.session_transaction() as session:
+            session['logged_in'] = True
+        if selected("index"):
+            results.update(benchmark_index(test_client, args.repeat))
+        if selected("render"):
+            results.update(benchmark_render(test_client, args.repeat))
+        if selected("profile"):
+            player_ids = [player["id"] for player in players[:: max(1, len(players) // 50)]]
+            results.update(benchmark_profile(test_client, player_ids, args.repeat))
+
+    return {
+        "meta": {
+            "players": args.players,
+            "seed": args.seed,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "repeat": args.repeat,
+            "numpy": players_app.np is not None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(report: Dict, baseline: Dict) -> str:
+    """Tabela de medianas: base, atual e variação percentual"""
+    lines = [f"{'benchmark':<32} {'base (ms)':>12} {'atual (ms)':>12} {'variação':>10}"]
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        current = result["median_ms"]
+        if base is None:
+            lines.append(f"{name:<32} {'-':>12} {current:>12.3f} {'novo':>10}")
+            continue
+        change = (current - base["median_ms"]) / base["median_ms"] * 100 if base["median_ms"] else 0.0
+        lines.append(f"{name:<32} {base['median_ms']:>12.3f} {current:>12.3f} {change:>+9.1f}%")
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, busca, index(), renderização e perfil")
+    parser.add_argument('--players', type=int, default=20000, help="tamanho do elenco sintético (10k-500k)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.0, help="atraso da API local por requisição (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="variação do atraso (± s)")
+    parser.add_argument('--repeat', type=int, default=10, help="execuções medidas por benchmark")
+    parser.add_argument('--only', help="grupos separados por vírgula: load,store,search,index,render,profile")
+    parser.add_argument('--output', help="arquivo JSON com o relatório (padrão: só a saída padrão)")
+    parser.add_argument('--compare', help="relatório JSON anterior para comparar as medianas")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            print(compare(report, json.load(baseline)))
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,185 @@
+"""
+API local de testes para o Brasileirão Players Search
+Substitui a API em localhost:8000 com jogadores sintéticos (paginação, ETag por página e mutações)
+
+Uso:
+    python mock_api.py --players 20000 --port 8000
+    python mock_api.py --players 20000 --latency 0.2 --jitter 0.05   # API lenta
+    curl -X POST "http://localhost:8000/_mock/mutate?changed=10&added=2&removed=1"
+"""
+from flask import Flask, jsonify, request, abort
+from datetime import date, timedelta
+from typing import List, Dict
+import argparse
+import random
+import threading
+import time
+
+app = Flask(__name__)
+
+# Latência simulada por requisição em segundos (variação uniforme de ±jitter); /_mock não atrasa
+app.config.setdefault("MOCK_LATENCY", 0.0)
+app.config.setdefault("MOCK_LATENCY_JITTER", 0.0)
+
+# Data de referência fixa para idades e contratos: o mesmo seed gera o mesmo elenco em qualquer dia
+REFERENCE_DATE = date(2026, 7, 1)
+
+# Nomes: primeiro nome + um ou dois sobrenomes (64 × (64 + 64 × 63) ≈ 262 mil combinações)
+FIRST_NAMES = ['João', 'Gabriel', 'Pedro', 'Lucas', 'Matheus', 'Rafael', 'Bruno', 'Thiago', 'Vitor',
+               'Éverton', 'André', 'Caio', 'Diego', 'Felipe', 'Igor', 'Luan', 'Marcos', 'Nathan',
+               'Otávio', 'Renan', 'Samuel', 'Wesley', 'Yuri', 'Giovanni', 'Heitor', 'Murilo',
+               'Carlos', 'Eduardo', 'Gustavo', 'Henrique', 'Leonardo', 'Rodrigo', 'Vinícius', 'Daniel',
+               'Fernando', 'Ricardo', 'Paulo', 'Alexandre', 'Jorge', 'Arthur', 'Enzo', 'Davi',
+               'Bernardo', 'Miguel', 'Guilherme', 'Nicolas', 'Kauã', 'Ruan', 'Wellington', 'Everaldo',
+               'Fábio', 'Júlio', 'Cláudio', 'Márcio', 'Sérgio', 'Anderson', 'Alisson', 'Ederson',
+               'Raphael', 'Douglas', 'Emerson', 'Cristiano', 'Reinaldo', 'Luiz']
+LAST_NAMES = ['Silva', 'Santos', 'Souza', 'Oliveira', 'Pereira', 'Lima', 'Carvalho', 'Ferreira',
+              'Rodrigues', 'Almeida', 'Costa', 'Gomes', 'Martins', 'Araújo', 'Melo', 'Barbosa',
+              'Ribeiro', 'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Gonçalves',
+              'Mendes', 'Freitas', 'Cardoso', 'Teixeira', 'Correia', 'Pinto', 'Cavalcanti', 'Monteiro',
+              'Moura', 'Lopes', 'Vieira', 'Batista', 'Campos', 'Farias', 'Machado', 'Castro',
+              'Azevedo', 'Borges', 'Brito', 'Coelho', 'Cunha', 'Duarte', 'Fonseca', 'Garcia',
+              'Guimarães', 'Jesus', 'Leite', 'Macedo', 'Marques', 'Medeiros', 'Miranda', 'Nogueira',
+              'Peixoto', 'Queiroz', 'Ramos', 'Sampaio', 'Siqueira', 'Tavares', 'Valente', 'Xavier']
+POSITIONS = ['Goalkeeper', 'Centre-Back', 'Left-Back', 'Right-Back', 'Defensive Midfield',
+             'Central Midfield', 'Attacking Midfield', 'Left Winger', 'Right Winger', 'Centre-Forward']
+SERIES = ['Série A', 'Série B', 'Série C', 'Série D']
+
+# Estado da API: lista de jogadores protegida por lock (mutações concorrentes com leituras)
+_players: List[Dict] = []
+_players_by_id: Dict[str, Dict] = {}
+_players_lock = threading.Lock()
+_next_id = 1
+
+def _market_value(rng: random.Random) -> str:
+    """Valor de mercado nos formatos que aparecem na API real"""
+    value = rng.choice([50, 150, 300, 700, 1500, 4000, 12000]) * 1000
+    style = rng.random()
+    if style < 0.6:
+        return f"€{value / 1_000_000:.2f}m" if value >= 1_000_000 else f"€{value // 1000}k"
+    if style < 0.8:
+        return f"R$ {value:,}".replace(',', '.')
+    return str(value)
+
+def _name(rng: random.Random) -> str:
+    """Primeiro nome e um ou dois sobrenomes"""
+    surnames = rng.sample(LAST_NAMES, 2) if rng.random() < 0.6 else [rng.choice(LAST_NAMES)]
+    return " ".join([rng.choice(FIRST_NAMES), *surnames])
+
+def generate_player(rng: random.Random, player_id: int) -> Dict:
+    """Gera um jogador sintético determinístico para o gerador informado (datas a partir de REFERENCE_DATE)"""
+    today = REFERENCE_DATE
+    birth = today - timedelta(days=rng.randint(17 * 365, 38 * 365))
+    contract = today + timedelta(days=rng.randint(-30, 5 * 365))
+    serie = rng.choice(SERIES)
+    return {
+        "id": str(player_id),
+        "name": _name(rng),
+        "position": rng.choice(POSITIONS),
+        "serie": serie,
+        "club_name": f"Clube {serie[-1]}{rng.randint(1, 20):02d}",
+        "age": (today - birth).days // 365,
+        "dateOfBirth": birth.strftime("%Y-%m-%d" if rng.random() < 0.8 else "%d/%m/%Y"),
+        "marketValue": _market_value(rng) if rng.random() < 0.9 else "N/A",
+        "contract": contract.strftime("%Y-%m-%d" if rng.random() < 0.85 else "%d/%m/%Y") if rng.random() < 0.9 else None,
+    }
+
+def generate_players(count: int, seed: int = 42) -> List[Dict]:
+    """Gera o elenco sintético completo"""
+    rng = random.Random(seed)
+    return [generate_player(rng, player_id) for player_id in range(1, count + 1)]
+
+def load_players(count: int, seed: int = 42):
+    """Substitui o elenco servido pela API"""
+    global _players, _players_by_id, _next_id
+    players = generate_players(count, seed)
+    with _players_lock:
+        _players = players
+        _players_by_id = {player["id"]: player for player in players}
+        _next_id = count + 1
+
+@app.before_request
+def simulate_latency():
+    """Atraso configurável para reproduzir a API real"""
+    latency = app.config["MOCK_LATENCY"]
+    if latency > 0 and not request.path.startswith('/_mock'):
+        jitter = app.config["MOCK_LATENCY_JITTER"]
+        time.sleep(max(0.0, random.uniform(latency - jitter, latency + jitter)))
+
+@app.route('/players')
+def list_players():
+    """Página de jogadores com X-Total-Count e ETag (responde 304 com If-None-Match)"""
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    with _players_lock:
+        response = jsonify(_players[offset:offset + limit])
+        response.headers['X-Total-Count'] = str(len(_players))
+    response.add_etag()
+    return response.make_conditional(request)
+
+def _find_player(player_id: str) -> Dict:
+    with _players_lock:
+        player = _players_by_id.get(player_id)
+    if player is None:
+        abort(404)
+    return player
+
+@app.route('/players/<player_id>/profile')
+def player_profile(player_id):
+    """Perfil do jogador"""
+    player = _find_player(player_id)
+    return jsonify({**player, "citizenship": "Brasil", "foot": "right", "height": "1,80 m"})
+
+@app.route('/players/<player_id>/stats')
+def player_stats(player_id):
+    """Estatísticas por temporada e competição"""
+    player = _find_player(player_id)
+    rng = random.Random(player_id)
+    stats = []
+    for season in range(2018, 2025):
+        for competition_id, competition_name in (("BRA1", "Campeonato Brasileiro"), ("CDB", "Copa do Brasil")):
+            stats.append({
+                "seasonId": str(season),
+                "competitionId": competition_id,
+                "competitionName": competition_name,
+                "clubId": player["club_name"],
+                "appearances": rng.randint(0, 38),
+                "minutesPlayed": rng.randint(0, 3400),
+                "goals": rng.randint(0, 15),
+                "assists": rng.randint(0, 10),
+                "yellowCards": rng.randint(0, 8),
+                "redCards": rng.randint(0, 1),
+            })
+    return jsonify({"playerId": player_id, "stats": stats})
+
+@app.route('/_mock/mutate', methods=['POST'])
+def mutate():
+    """Altera, adiciona e remove jogadores para testar a sincronização incremental"""
+    global _players_by_id, _next_id
+    changed = request.args.get('changed', 10, type=int)
+    added = request.args.get('added', 0, type=int)
+    removed = request.args.get('removed', 0, type=int)
+    rng = random.Random()
+    with _players_lock:
+        for player in rng.sample(_players, min(changed, len(_players))):
+            player["marketValue"] = _market_value(rng)
+        for _ in range(min(removed, len(_players))):
+            _players.pop(rng.randrange(len(_players)))
+        for _ in range(added):
+            _players.append(generate_player(rng, _next_id))
+            _next_id += 1
+        _players_by_id = {player["id"]: player for player in _players}
+        total = len(_players)
+    return jsonify({"changed": changed, "added": added, "removed": removed, "total": total})
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="API local de testes")
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="atraso por requisição (segundos)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="variação do atraso (± segundos)")
+    args = parser.parse_args()
+    app.config.update(MOCK_LATENCY=args.latency, MOCK_LATENCY_JITTER=args.jitter)
+    load_players(args.players, args.seed)
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
@@ -0,0 +1,9 @@
+"""Configuração comum dos testes: app.py e mock_api.py ficam na raiz do projeto"""
+import os
+import sys
+
+# Sem snapshot em disco e sem logs durante os testes (lidos na importação de app.py)
+os.environ.setdefault("PLAYERS_SNAPSHOT_DIR", "")
+os.environ.setdefault("LOG_LEVEL", "OFF")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,157 @@
+"""_LRUCache: coalescência em threads e no loop assíncrono, TTLs e despejo"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return {"id": "1"}
+
+        fetcher = asyncio.ensure_future(cache.aget("1", fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.aget("1", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(fetcher, *waiters, return_exceptions=True)
+
+    fetched, cancelled, waited = asyncio.run(scenario())
+    assert fetched == {"id": "1"}
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert waited == {"id": "1"}
+    assert cache.get("1", lambda: None) == {"id": "1"}
+    assert cache.stats()["coalesced"] == 2
+
+
+class _Clock:
+    """Relógio controlado pelo teste (o cache lê time.time())"""
+
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(app.time, "time", lambda: self.now)
+
+
+def _counting(value):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return value
+    return fetch, calls
+
+
+def test_concurrent_gets_share_one_fetch():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"id": "7"}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get("7", fetch)))
+    first.start()
+    started.wait(5)
+    others = [threading.Thread(target=lambda: results.append(cache.get("7", fetch))) for _ in range(4)]
+    for thread in others:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [first, *others]:
+        thread.join(5)
+    assert calls == [1]
+    assert results == [{"id": "7"}] * 5
+    assert cache.stats()["misses"] == 1
+
+
+def test_sync_and_async_callers_share_entries():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+
+    async def fetch():
+        return {"id": "3"}
+
+    assert asyncio.run(cache.aget("3", fetch)) == {"id": "3"}
+    assert cache.get("3", lambda: pytest.fail("não deveria buscar de novo")) == {"id": "3"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_errors_are_not_cached():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+    fetch, calls = _counting(None)
+    assert cache.get("1", fetch) is None
+    assert cache.get("1", fetch) is None
+    assert len(calls) == 2
+    assert cache.stats()["errors"] == 2 and cache.stats()["size"] == 0
+
+
+def test_exception_releases_waiters_without_caching():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+
+    def fetch():
+        raise RuntimeError("API fora do ar")
+
+    with pytest.raises(RuntimeError):
+        cache.get("1", fetch)
+    assert cache.get("1", lambda: {"id": "1"}) == {"id": "1"}
+
+
+def test_not_found_is_cached_for_negative_ttl(monkeypatch):
+    clock = _Clock(monkeypatch)
+    cache = app._LRUCache(max_size=10, ttl=600, negative_ttl=30)
+    fetch, calls = _counting(app._LRUCache.NOT_FOUND)
+    assert cache.get("404", fetch) is None
+    clock.now += 29
+    assert cache.get("404", fetch) is None
+    assert len(calls) == 1 and cache.stats()["negative_hits"] == 1
+    clock.now += 2
+    assert cache.get("404", fetch) is None
+    assert len(calls) == 2
+
+
+def test_values_expire_after_ttl(monkeypatch):
+    clock = _Clock(monkeypatch)
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=5)
+    fetch, calls = _counting({"id": "1"})
+    cache.get("1", fetch)
+    clock.now += 59
+    cache.get("1", fetch)
+    assert len(calls) == 1
+    clock.now += 2
+    cache.get("1", fetch)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = app._LRUCache(max_size=2, ttl=60, negative_ttl=60)
+    cache.get("a", lambda: "A")
+    cache.get("b", lambda: "B")
+    cache.get("a", lambda: pytest.fail("'a' ainda está no cache"))  # 'a' passa a ser o mais recente
+    cache.get("c", lambda: "C")
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+    assert cache.get("a", lambda: pytest.fail("'a' não deveria ter saído")) == "A"
+    fetch, calls = _counting("B2")
+    assert cache.get("b", fetch) == "B2" and calls == [1]
+
+
+def test_clear_drops_entries():
+    cache = app._LRUCache(max_size=10, ttl=60, negative_ttl=60)
+    cache.get("1", lambda: "um")
+    cache.clear()
+    assert cache.get("1", lambda: "de novo") == "de novo"
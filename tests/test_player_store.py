@@ -0,0 +1,211 @@
+"""Sincronização incremental do PlayerStore: diff e apply_delta sobre lista e snapshot"""
+import random
+import threading
+import time
+
+import pytest
+
+import app
+import mock_api
+
+
+def _players():
+    return mock_api.generate_players(200, seed=7)
+
+
+@pytest.fixture(params=["players", "snapshot"])
+def store(request, tmp_path):
+    """Armazenamento montado da lista da API ou de um snapshot mapeado em memória"""
+    players = _players()
+    if request.param == "players":
+        return app.PlayerStore.from_players(players)
+    path = str(tmp_path / "players.snapshot")
+    app._RosterSnapshot.write(path, players, 1, time.time())
+    return app.PlayerStore.from_snapshot(app._RosterSnapshot(path))
+
+
+def _live(store):
+    """Registros vivos por id"""
+    return {store.ids[row]: store.records[row] for row in store.rows(store.all_rows)}
+
+
+def _ids(store, rows):
+    return {store.ids[row] for row in rows}
+
+
+def _ordered_ids(store, sort_by):
+    """Ids vivos na permutação da ordenação (as permutações incluem as linhas removidas)"""
+    return [store.ids[row] for row in store.order(sort_by) if store.all_rows >> row & 1]
+
+
+def test_diff_without_changes(store):
+    players = _players()
+    assert store.diff(players, players) == ([], [])
+
+
+def test_diff_reports_changed_added_and_removed(store):
+    players = _players()
+    changed = dict(players[10], marketValue="€9.99m")
+    added = dict(players[0], id="9001", name="Novo Jogador")
+    new_roster = [changed if p["id"] == changed["id"] else p for p in players[:-2]] + [added]
+    upserts, removed = store.diff(new_roster, [players[0], changed, added])
+    assert upserts == [changed, added]
+    assert sorted(removed) == sorted(p["id"] for p in players[-2:])
+
+
+def test_diff_rejects_missing_or_duplicate_ids(store):
+    players = _players()
+    assert store.diff(players + [players[0]], []) is None
+    assert store.diff(players + [{"name": "Sem Id"}], []) is None
+
+
+def test_apply_delta_adds_player(store):
+    version = store.version
+    player = dict(_players()[0], id="9001", name="Zacarias Quintanilha", position="Goalkeeper",
+                  serie="Série D", club_name="Clube Novo", age=19)
+    store.apply_delta([player], [])
+    assert store.count == 201
+    assert store.version != version
+    row = store.rows_by_id()["9001"]
+    assert store.records[row] == player
+    assert store.search_name("quintanilha", store.all_rows) == [row]
+    assert store.match(club="Clube Novo") == 1 << row
+    assert row in store.rows(store.match(position="Goalkeeper", serie="Série D", age_min=19, age_max=19))
+    assert store.projector(["id", "name", "club_name"])(row) == {
+        "id": "9001", "name": "Zacarias Quintanilha", "club_name": "Clube Novo"}
+    assert row in store.order("name")
+
+
+def test_apply_delta_changes_player(store):
+    player = _players()[5]
+    row = store.rows_by_id()[player["id"]]
+    changed = dict(player, name="Xisto Renomeado", position="Left Winger", serie="Série A",
+                   club_name="Clube Trocado", marketValue="€12.00m", contract="2031-06-30")
+    store.apply_delta([changed], [])
+    assert store.count == 200
+    assert store.records[row] == changed
+    assert store.search_name(player["name"], store.all_rows).count(row) == 0
+    assert store.search_name("renomeado", store.all_rows) == [row]
+    assert store.match(club=player["club_name"]) >> row & 1 == 0
+    assert store.match(club="Clube Trocado") == 1 << row
+    assert row in store.rows(store.match(market_value_min=12_000_000, market_value_max=12_000_000))
+    assert row in store.rows(store.match(contract_end_min=app.date(2031, 6, 30).toordinal()))
+    projected = store.projector(["name", "position", "serie", "market_value", "contract_end"])(row)
+    assert projected == {"name": "Xisto Renomeado", "position": "Left Winger", "serie": "Série A",
+                         "market_value": 12_000_000.0, "contract_end": "2031-06-30"}
+
+
+def test_apply_delta_removes_player(store):
+    player = _players()[3]
+    row = store.rows_by_id()[player["id"]]
+    store.apply_delta([], [player["id"]])
+    assert store.count == 199
+    assert player["id"] not in store.rows_by_id()
+    assert player["id"] not in _ids(store, store.rows(store.all_rows))
+    assert row not in store.search_name(player["name"], store.all_rows)
+    assert store.match(club=player["club_name"]) >> row & 1 == 0
+    assert store.match(contract_end_min=0) >> row & 1 == 0
+    assert store.facets({}, store.all_rows)["total"] == 199
+
+
+def test_delta_matches_full_rebuild(store):
+    players = _players()
+    new_roster = [dict(p, marketValue="€1.50m") if i % 7 == 0 else p for i, p in enumerate(players[3:])]
+    new_roster.append(dict(players[0], id="9001", name="Recém Chegado"))
+    store.apply_delta(*store.diff(new_roster, new_roster))
+    rebuilt = app.PlayerStore.from_players(new_roster)
+    assert _live(store) == _live(rebuilt)
+    for filters in ({"serie": "Série B"}, {"position": "Centre-Back", "age_min": 20, "age_max": 30},
+                    {"market_value_min": 1_000_000}):
+        assert _ids(store, store.rows(store.match(**filters))) == _ids(rebuilt, rebuilt.rows(rebuilt.match(**filters)))
+    for sort_by in ("name", "market_value", "contract_end"):
+        assert _ordered_ids(store, sort_by) == _ordered_ids(rebuilt, sort_by)
+
+
+def _snapshot_of(store):
+    """Resultados de leitura que não podem mudar enquanto um delta é montado"""
+    return (_live(store), store.count, store.search_name("silva", store.all_rows),
+            store.match(serie="Série A", age_min=20, age_max=30), store.facets({}, store.all_rows),
+            _ordered_ids(store, "name"))
+
+
+def test_with_delta_leaves_published_store_intact(store, monkeypatch):
+    players = _players()
+    store.prepare_orders()
+    before = _snapshot_of(store)
+    seen = []
+    append = app._CategoricalColumn.append
+
+    def append_and_read(column, value):
+        # Leitor concorrente no meio do delta (linha nova já nos trigramas, tamanho ainda antigo)
+        seen.append(_snapshot_of(store))
+        append(column, value)
+
+    monkeypatch.setattr(app._CategoricalColumn, "append", append_and_read)
+    added = [dict(players[0], id=str(9000 + i), name=f"Silva Novo {i}", age=40 + i) for i in range(8)]
+    updated = store.with_delta(added + [dict(players[1], age=25, serie="Série A")], [players[2]["id"]])
+    assert seen and all(reading == before for reading in seen)
+    assert _snapshot_of(store) == before
+    assert updated.count == store.count + 7
+    assert updated.version != store.version
+
+
+def test_readers_during_concurrent_deltas(store):
+    players = _players()
+    published = [store]
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            current = published[0]
+            try:
+                rows = current.search_name("silva", current.match(age_min=18, age_max=45))
+                assert all(current.all_rows >> row & 1 for row in rows)
+                current.facets(current.filter_bitmaps(serie="Série B"), current.all_rows)
+            except Exception as e:  # pragma: no cover - só aparece com a corrida
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(40):
+            added = dict(players[0], id=str(10_000 + i), name=f"Silva Concorrente {i}", age=18 + i % 30)
+            published[0] = published[0].with_delta([added], [players[i]["id"]])
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    assert published[0].count == 200
+
+
+def _top_by_serie_reference(store, sort_by, reverse, rows, per_serie):
+    """Ordena todas as linhas e corta por série (o que top_by_serie evita fazer)"""
+    groups = {}
+    for row in sorted(rows, key=store.sort_key(sort_by), reverse=reverse):
+        groups.setdefault(store.serie.codes[row], []).append(row)
+    return [(store.serie.values[code], group[:per_serie]) for code, group in groups.items()]
+
+
+@pytest.mark.parametrize("sort_by", app.PLAYER_SORT_KEYS)
+@pytest.mark.parametrize("reverse", [False, True])
+def test_top_by_serie_matches_full_sort(sort_by, reverse):
+    store = app.PlayerStore.from_players(mock_api.generate_players(400, seed=11))
+    rng = random.Random(f"{sort_by}-{reverse}")
+    for _ in range(10):
+        per_serie = rng.choice([1, 3, 25])
+        # Muitas linhas: caminha pela permutação; poucas (< 1/8 do elenco): heap por série
+        for fraction in (1.0, 0.5, 0.05):
+            rows = sorted(rng.sample(range(store.size), int(store.size * fraction)))
+            bitmap = app._rows_to_bitmap(rows, store.size)
+            assert store.top_by_serie(sort_by, reverse, bitmap, per_serie=per_serie) == \
+                _top_by_serie_reference(store, sort_by, reverse, rows, per_serie)
+        # Linhas vindas da busca por nome, na ordem de relevância em que a busca as devolveu
+        for name_rows in (store.search_name(rng.choice(["silva", "santos", "ro"]), store.all_rows),
+                          rng.sample(range(store.size), rng.randint(1, 60))):
+            bitmap = app._rows_to_bitmap(name_rows, store.size)
+            assert store.top_by_serie(sort_by, reverse, bitmap, name_rows, per_serie) == \
+                _top_by_serie_reference(store, sort_by, reverse, name_rows, per_serie)
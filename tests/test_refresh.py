@@ -0,0 +1,74 @@
+"""Atualização do elenco contra a API local (mock_api): falha parcial seguida de sucesso"""
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import app
+import mock_api
+
+
+@pytest.fixture
+def api_url():
+    """mock_api servido numa porta livre, com 3 páginas de jogadores"""
+    mock_api.load_players(3 * app.PLAYERS_PAGE_SIZE)
+    server = make_server("127.0.0.1", 0, mock_api.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    thread.join()
+
+
+def _live(store):
+    return {store.ids[row]: store.records[row] for row in store.rows(store.all_rows)}
+
+
+def _api_roster():
+    with mock_api._players_lock:
+        return {player["id"]: dict(player) for player in mock_api._players}
+
+
+def _mutate(**params):
+    response = mock_api.app.test_client().post("/_mock/mutate", query_string=params)
+    assert response.status_code == 200
+
+
+def test_partial_refresh_is_discarded_then_synced(api_url, monkeypatch):
+    client = app.APIClient(api_url, snapshot_dir="")
+    client._refresh_from_api()
+    store = client._store
+    before = _live(store)
+    assert before == _api_roster()
+
+    _mutate(changed=60)
+    fetch_page = client._fetch_players_page
+    failed_offset = app.PLAYERS_PAGE_SIZE
+    monkeypatch.setattr(client, "_fetch_players_page", lambda offset: (
+        (None, "falha simulada", None, None) if offset == failed_offset else fetch_page(offset)))
+    client._refresh_from_api()
+    assert client.last_fetch_report["complete"] is False
+    assert client._store is store and _live(store) == before
+
+    # As ETags das páginas que vieram na carga descartada não podem esconder as mudanças delas
+    monkeypatch.setattr(client, "_fetch_players_page", fetch_page)
+    client._refresh_from_api()
+    assert client.last_fetch_report["complete"] is True
+    # Aplicado como delta numa cópia (a geração só muda ao reconstruir); a versão antiga fica intacta
+    assert client._store is not store and client._store.generation == store.generation
+    assert _live(client._store) == _api_roster()
+    assert _live(store) == before
+
+
+def test_refresh_applies_added_and_removed_players(api_url):
+    client = app.APIClient(api_url, snapshot_dir="")
+    client._refresh_from_api()
+    _mutate(changed=5, added=3, removed=2)
+    client._refresh_from_api()
+    roster = _api_roster()
+    assert _live(client._store) == roster
+    assert client._store.count == len(roster)
+    # Sem mudanças na API: todas as páginas voltam 304 e o elenco fica como está
+    version = client._store.version
+    client._refresh_from_api()
+    assert client._store.version == version
@@ -0,0 +1,53 @@
+"""/api/players/search: paginação por cursor presa à busca que o gerou"""
+import base64
+import json
+
+import pytest
+
+import app
+import mock_api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = app.PlayerStore.from_players(mock_api.generate_players(120, seed=3))
+    monkeypatch.setattr(app.api_client, "_get_store", lambda: store)
+    test_client = app.app.test_client()
+    with test_client.session_transaction() as session:
+        session["logged_in"] = True
+    return test_client
+
+
+def _tamper(cursor, **changes):
+    state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    state.update(changes)
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip("=")
+
+
+def test_cursor_pages_through_the_whole_result(client):
+    ids, cursor = [], None
+    while True:
+        params = {"serie": "Série B", "sort_by": "age", "order": "desc", "limit": 7, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/players/search", query_string=params).get_json()
+        ids += [player["id"] for player in page["players"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(ids) == len(set(ids)) == page["total"]
+
+
+@pytest.mark.parametrize("changed", [{"sort_by": "market_value"}, {"order": "asc"}, {"serie": "Série A"},
+                                     {"search_name": "silva"}])
+def test_cursor_from_another_query_is_rejected(client, changed):
+    params = {"serie": "Série B", "sort_by": "age", "order": "desc", "limit": 5}
+    cursor = client.get("/api/players/search", query_string=params).get_json()["next_cursor"]
+    response = client.get("/api/players/search", query_string={**params, **changed, "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_negative_cursor_position_is_rejected(client):
+    cursor = client.get("/api/players/search", query_string={"limit": 5}).get_json()["next_cursor"]
+    response = client.get("/api/players/search", query_string={"limit": 5, "cursor": _tamper(cursor, p=-3)})
+    assert response.status_code == 400